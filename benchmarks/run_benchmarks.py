@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+
+import argparse
+import json
+import logging
+import os
+import statistics
+import sys
+import time
+import typing
+
+import homepose.libs.deployment
+import homepose.libs.environment
+import homepose.libs.hosts
+import homepose.libs.templating
+import homepose.libs.utils
+import benchmarks.sandbox
+
+BASELINE_FILE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+DEFAULT_REPEATS = 5
+DEFAULT_TOLERANCE = 0.5
+ABSOLUTE_SLACK = 0.005
+
+SANDBOX_SERVICES = ['postgres', 'redis', 'gitea', 'drone', 'homesite', 'nextcloud', 'collabora', 'grafana', 'prometheus', 'loki', 'vaultwarden', 'rproxy']
+SANDBOX_DEPENDENCIES = {'drone': ['gitea'], 'nextcloud': ['redis'], 'collabora': ['nextcloud'], 'grafana': ['prometheus', 'loki']}
+
+
+def measure(function: typing.Callable[[], typing.Any], repeats: int, setup: typing.Callable[[], typing.Any] = lambda: None) -> float:
+    durations = []
+    for _ in range(repeats):
+        setup()
+        started_at = time.perf_counter()
+        function()
+        durations.append(time.perf_counter() - started_at)
+    return statistics.median(durations)
+
+
+def benchmark_templates(homepose_sandbox: benchmarks.sandbox.HomeposeSandbox, repeats: int) -> dict:
+    homepose.libs.environment.HomeposeDeployEnvironment().export_config()
+    templates_folder = f'{homepose_sandbox.root_path}/stack/templates/bench'
+    os.makedirs(templates_folder, exist_ok=True)
+    os.makedirs(f'{homepose_sandbox.root_path}/stack/generated/bench', exist_ok=True)
+    os.environ.update({f'BENCH_VARIABLE_{variable_index}': f'value-{variable_index}' for variable_index in range(5000)})
+    for template_index in range(300):
+        with open(f'{templates_folder}/template_{template_index}.conf', 'w', encoding='utf-8') as template_file:
+            template_file.writelines(
+                f'setting_{line_index} = [BENCH_VARIABLE_{(template_index * 37 + line_index) % 5000}] # plain text around markers\n'
+                for line_index in range(200)
+            )
+
+    def render() -> None:
+        homepose.libs.utils.fill_templates(f'{homepose_sandbox.root_path}/stack/templates', f'{homepose_sandbox.root_path}/stack/generated')
+
+    def reset_engine() -> None:
+        homepose.libs.templating.TEMPLATE_ENGINE = homepose.libs.templating.HomeposeTemplateEngine()
+        for generated_file in os.listdir(f'{homepose_sandbox.root_path}/stack/generated/bench'):
+            os.remove(f'{homepose_sandbox.root_path}/stack/generated/bench/{generated_file}')
+
+    return {
+        'templates_cold_render': measure(render, repeats, reset_engine),
+        'templates_warm_render': measure(render, repeats)
+    }
+
+
+def benchmark_config(homepose_sandbox: benchmarks.sandbox.HomeposeSandbox, repeats: int) -> dict:
+    config_file_path = f'{homepose_sandbox.root_path}/large_config.ini'
+    with open(config_file_path, 'w', encoding='utf-8') as config_file:
+        for section_index in range(50):
+            config_file.write(f'[SECTION_{section_index}]\n')
+            config_file.writelines(
+                f'SETTING_{section_index}_{setting_index}={f"${{SETTING_{section_index}_{setting_index - 1}}}" if setting_index % 5 else "/srv"}/part_{setting_index}\n'
+                for setting_index in range(100)
+            )
+        config_file.write('[REQUIRED]\n')
+        config_file.writelines(f'{setting_name}={setting}\n' for setting_name, setting in homepose_sandbox.get_config().items())
+    snapshot_path = f'{config_file_path}{homepose.libs.vars.CONFIG_SNAPSHOT_SUFFIX}'
+
+    def remove_snapshot() -> None:
+        if os.path.exists(snapshot_path):
+            os.remove(snapshot_path)
+
+    def load() -> None:
+        homepose.libs.environment.HomeposeDeployEnvironment.load_config(config_file_path)
+
+    return {
+        'config_cold_parse': measure(load, repeats, remove_snapshot),
+        'config_snapshot_load': measure(load, repeats)
+    }
+
+
+def benchmark_hosts(homepose_sandbox: benchmarks.sandbox.HomeposeSandbox, repeats: int) -> dict:
+    hosts_file_path = f'{homepose_sandbox.root_path}/etc/bench_hosts'
+    managed_entries = {f'service-{entry_index}': f'10.1.{entry_index // 250}.{entry_index % 250}' for entry_index in range(2000)}
+
+    def create_hosts_file() -> None:
+        with open(hosts_file_path, 'w', encoding='utf-8') as hosts_file:
+            hosts_file.write('127.0.0.1 localhost\n')
+            hosts_file.writelines(f'192.168.{entry_index // 250}.{entry_index % 250} machine-{entry_index}\n' for entry_index in range(5000))
+
+    def apply_all() -> None:
+        homepose.libs.hosts.HomeposeHostsFile(hosts_file_path).apply(managed_entries)
+
+    updated_entries = {**managed_entries, 'service-0': '10.9.9.9'}
+    hosts_file = homepose.libs.hosts.HomeposeHostsFile(hosts_file_path)
+    return {
+        'hosts_initial_apply': measure(apply_all, repeats, create_hosts_file),
+        'hosts_single_update': measure(
+            lambda: hosts_file.apply(updated_entries),
+            repeats,
+            lambda: hosts_file.apply(managed_entries)
+        ),
+        'hosts_noop_apply': measure(lambda: hosts_file.apply(managed_entries), repeats)
+    }
+
+
+def benchmark_compose_services(homepose_sandbox: benchmarks.sandbox.HomeposeSandbox, repeats: int) -> dict:
+    homepose_sandbox.client.api.start_latency = 0.05
+    homepose_sandbox.client.api.pull_latency = 0.02
+    deployment = homepose.libs.deployment.HomeposeDeployment()
+    logger = homepose.libs.utils.HomeposeLogger()
+    return {
+        'compose_services_end_to_end': measure(lambda: deployment.compose_services(SANDBOX_SERVICES, logger), repeats),
+        'reconcile_services_noop': measure(lambda: deployment.reconcile_services(SANDBOX_SERVICES, logger), repeats)
+    }
+
+
+def run_benchmarks(repeats: int) -> dict:
+    logging.disable(logging.WARNING)
+    results: dict = {}
+    for benchmark in (benchmark_templates, benchmark_config, benchmark_hosts, benchmark_compose_services):
+        with benchmarks.sandbox.HomeposeSandbox(SANDBOX_SERVICES, SANDBOX_DEPENDENCIES) as homepose_sandbox:
+            results.update(benchmark(homepose_sandbox, repeats))
+    return results
+
+
+def compare_with_baseline(results: dict, baseline: dict, tolerance: float) -> list:
+    regressions = []
+    print(f'{"BENCHMARK":<32} {"BASELINE [s]":>13} {"CURRENT [s]":>12} {"RATIO":>7}')
+    for benchmark_name, duration in sorted(results.items()):
+        baseline_duration = baseline.get(benchmark_name)
+        ratio = duration / baseline_duration if baseline_duration else float('nan')
+        is_regression = baseline_duration is not None and duration > baseline_duration * (1 + tolerance) + ABSOLUTE_SLACK
+        print(f'{benchmark_name:<32} {baseline_duration or float("nan"):>13.4f} {duration:>12.4f} {ratio:>7.2f}{"  REGRESSION" if is_regression else ""}')
+        if is_regression:
+            regressions.append(benchmark_name)
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Benchmarks of the HomePose deployment pipeline run against a fake Docker backend')
+    parser.add_argument('--repeats', type=int, default=DEFAULT_REPEATS)
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE, help='Allowed relative slowdown against the baseline')
+    parser.add_argument('--baseline', default=BASELINE_FILE_PATH)
+    parser.add_argument('--update-baseline', action='store_true')
+    arguments = parser.parse_args()
+
+    results = run_benchmarks(arguments.repeats)
+    if arguments.update_baseline:
+        with open(arguments.baseline, 'w', encoding='utf-8') as baseline_file:
+            json.dump({benchmark_name: round(duration, 6) for benchmark_name, duration in sorted(results.items())}, baseline_file, indent=2)
+            baseline_file.write('\n')
+        print(f'Baseline written to {arguments.baseline}')
+        return 0
+    baseline: dict = {}
+    if os.path.exists(arguments.baseline):
+        with open(arguments.baseline, 'r', encoding='utf-8') as baseline_file:
+            baseline = json.load(baseline_file)
+    if regressions := compare_with_baseline(results, baseline, arguments.tolerance):
+        print(f'Performance regressions detected: {", ".join(regressions)}', file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
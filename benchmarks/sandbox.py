@@ -0,0 +1,486 @@
+import contextlib
+import dataclasses
+import itertools
+import os
+import pwd
+import queue
+import tempfile
+import threading
+import time
+import typing
+
+import docker  # type: ignore
+import yaml  # type: ignore
+
+import homepose.libs.compose
+import homepose.libs.environment
+import homepose.libs.vars
+
+SANDBOX_HOST_ADDRESS = '10.0.0.1'
+SANDBOX_HOSTS_NETWORK = '10.0.1'
+
+
+def matches_filters(resource: dict, filters: typing.Optional[dict]) -> bool:
+    for filter_name, filter_values in (filters or {}).items():
+        filter_values = filter_values if isinstance(filter_values, list) else [filter_values]
+        if filter_name == 'label':
+            for label_filter in filter_values:
+                label_name, has_value, label_value = str(label_filter).partition('=')
+                if label_name not in resource['Labels'] or (has_value and resource['Labels'][label_name] != label_value):
+                    return False
+        elif filter_name == 'status' and resource.get('State') not in filter_values:
+            return False
+        elif filter_name == 'name' and resource['Name'] not in filter_values:
+            return False
+    return True
+
+
+@dataclasses.dataclass
+class HomeposeFakeEventsStream():
+    events: queue.Queue = dataclasses.field(default_factory=queue.Queue)
+    on_close: typing.Callable[['HomeposeFakeEventsStream'], None] = dataclasses.field(default=lambda _: None)
+
+    def __iter__(self) -> typing.Iterator[dict]:
+        while (event := self.events.get()) is not None:
+            yield event
+
+    def close(self) -> None:
+        self.events.put(None)
+        self.on_close(self)
+
+
+@dataclasses.dataclass
+class HomeposeFakeDockerAPI():  # pylint: disable=R0902,R0904
+    start_latency: float = dataclasses.field(default=0.0)
+    pull_latency: float = dataclasses.field(default=0.0)
+    build_latency: float = dataclasses.field(default=0.0)
+    services_latencies: dict = dataclasses.field(default_factory=dict)
+
+    containers_state: dict = dataclasses.field(init=False, default_factory=dict)
+    networks_state: dict = dataclasses.field(init=False, default_factory=dict)
+    volumes_state: dict = dataclasses.field(init=False, default_factory=dict)
+    images_state: dict = dataclasses.field(init=False, default_factory=dict)
+    calls_count: dict = dataclasses.field(init=False, default_factory=dict)
+
+    __subscribers: list = dataclasses.field(init=False, default_factory=list)
+    __identifiers: typing.Iterator[int] = dataclasses.field(init=False, default_factory=itertools.count)
+    __lock: threading.RLock = dataclasses.field(init=False, default_factory=threading.RLock)
+
+    def record_call(self, call_name: str) -> None:
+        with self.__lock:
+            self.calls_count[call_name] = self.calls_count.get(call_name, 0) + 1
+
+    def get_new_id(self) -> str:
+        with self.__lock:
+            return f'{next(self.__identifiers):064x}'
+
+    def find_container(self, container_reference: str) -> dict:
+        with self.__lock:
+            for container in self.containers_state.values():
+                if container_reference in (container['Id'], container['Name']):
+                    return container
+        raise docker.errors.NotFound(f'No such container: {container_reference}')
+
+    def emit_event(self, container: dict, status: str) -> None:
+        event = {
+            'status': status,
+            'Action': status,
+            'id': container['Id'],
+            'time': int(time.time()),
+            'Actor': {'ID': container['Id'], 'Attributes': {**container['Labels'], 'name': container['Name']}}
+        }
+        with self.__lock:
+            subscribers = list(self.__subscribers)
+        for subscriber in subscribers:
+            subscriber.events.put(event)
+
+    def subscribe(self) -> HomeposeFakeEventsStream:
+        events_stream = HomeposeFakeEventsStream(on_close=self.unsubscribe)
+        with self.__lock:
+            self.__subscribers.append(events_stream)
+        return events_stream
+
+    def unsubscribe(self, events_stream: HomeposeFakeEventsStream) -> None:
+        with self.__lock:
+            if events_stream in self.__subscribers:
+                self.__subscribers.remove(events_stream)
+
+    def containers(self, all: bool = False, filters: typing.Optional[dict] = None) -> list:  # pylint: disable=W0622
+        self.record_call('containers')
+        with self.__lock:
+            return [
+                {**container, 'Names': [f'/{container["Name"]}']}
+                for container in self.containers_state.values()
+                if (all or container['State'] == 'running') and matches_filters(container, filters)
+            ]
+
+    def inspect_container(self, container_reference: str) -> dict:
+        self.record_call('inspect_container')
+        container = self.find_container(container_reference)
+        return {
+            'Id': container['Id'],
+            'Name': f'/{container["Name"]}',
+            'Config': {'Labels': container['Labels']},
+            'State': {'Status': container['State'], 'Running': container['State'] == 'running', 'ExitCode': 0}
+        }
+
+    def create_container(self, image: str, name: str = '', labels: typing.Optional[dict] = None, **_) -> dict:
+        self.record_call('create_container')
+        with self.__lock:
+            if name and any(container['Name'] == name for container in self.containers_state.values()):
+                raise docker.errors.APIError(f'Conflict: container name {name} is already in use')
+            container_id = self.get_new_id()
+            self.containers_state[container_id] = {
+                'Id': container_id,
+                'Name': name or container_id[:12],
+                'Image': image,
+                'Labels': dict(labels or {}),
+                'State': 'created'
+            }
+        return {'Id': container_id}
+
+    @staticmethod
+    def create_host_config(**host_config) -> dict:
+        return host_config
+
+    @staticmethod
+    def create_networking_config(endpoints_config: dict) -> dict:
+        return endpoints_config
+
+    @staticmethod
+    def create_endpoint_config(**endpoint_config) -> dict:
+        return endpoint_config
+
+    def connect_container_to_network(self, container_reference: str, *_, **__) -> None:
+        self.record_call('connect_container_to_network')
+        self.find_container(container_reference)
+
+    def start(self, container_reference: str) -> None:
+        self.record_call('start')
+        container = self.find_container(container_reference)
+        service_name = container['Labels'].get(homepose.libs.vars.HOMEPOSE_SERVICE_LABEL, '')
+        time.sleep(self.services_latencies.get(service_name, self.start_latency))
+        with self.__lock:
+            container['State'] = 'running'
+        self.emit_event(container, 'start')
+
+    def kill(self, container_reference: str, **_) -> None:
+        self.record_call('kill')
+        container = self.find_container(container_reference)
+        with self.__lock:
+            container['State'] = 'exited'
+        self.emit_event(container, 'die')
+
+    def remove_container(self, container_reference: str, force: bool = False) -> None:
+        self.record_call('remove_container')
+        container = self.find_container(container_reference)
+        if container['State'] == 'running' and not force:
+            raise docker.errors.APIError(f'Container {container_reference} is running')
+        with self.__lock:
+            self.containers_state.pop(container['Id'], None)
+        if container['State'] == 'running':
+            self.emit_event(container, 'die')
+
+    def networks(self, names: typing.Optional[list] = None, filters: typing.Optional[dict] = None) -> list:
+        self.record_call('networks')
+        with self.__lock:
+            return [
+                dict(network)
+                for network in self.networks_state.values()
+                if (names is None or any(name in network['Name'] for name in names)) and matches_filters(network, filters)
+            ]
+
+    def create_network(self, name: str, labels: typing.Optional[dict] = None, **_) -> dict:
+        self.record_call('create_network')
+        with self.__lock:
+            network_id = self.get_new_id()
+            self.networks_state[network_id] = {'Id': network_id, 'Name': name, 'Labels': dict(labels or {})}
+        return {'Id': network_id}
+
+    def remove_network(self, network_reference: str) -> None:
+        self.record_call('remove_network')
+        with self.__lock:
+            for network_id, network in list(self.networks_state.items()):
+                if network_reference in (network_id, network['Name']):
+                    del self.networks_state[network_id]
+                    return
+        raise docker.errors.NotFound(f'No such network: {network_reference}')
+
+    def inspect_volume(self, volume_name: str) -> dict:
+        self.record_call('inspect_volume')
+        with self.__lock:
+            if volume_name not in self.volumes_state:
+                raise docker.errors.NotFound(f'No such volume: {volume_name}')
+            return self.volumes_state[volume_name]
+
+    def create_volume(self, volume_name: str, labels: typing.Optional[dict] = None, **_) -> dict:
+        self.record_call('create_volume')
+        with self.__lock:
+            self.volumes_state[volume_name] = {'Name': volume_name, 'Labels': dict(labels or {})}
+            return self.volumes_state[volume_name]
+
+    def inspect_image(self, image_name: str) -> dict:
+        self.record_call('inspect_image')
+        with self.__lock:
+            if image_name not in self.images_state:
+                raise docker.errors.ImageNotFound(f'No such image: {image_name}')
+            return self.images_state[image_name]
+
+    def register_image(self, image_name: str, labels: typing.Optional[dict] = None) -> None:
+        with self.__lock:
+            self.images_state[image_name] = {'Id': f'sha256:{self.get_new_id()}', 'RepoTags': [image_name], 'Labels': dict(labels or {})}
+
+    def pull(self, repository: str, tag: str = 'latest', **_) -> typing.Iterator[dict]:
+        self.record_call('pull')
+        yield {'status': f'Pulling from {repository}', 'id': tag}
+        time.sleep(self.pull_latency)
+        self.register_image(f'{repository}:{tag}')
+        yield {'status': f'Downloaded newer image for {repository}:{tag}'}
+
+    def build(self, path: str, tag: str, labels: typing.Optional[dict] = None, **_) -> typing.Iterator[dict]:
+        self.record_call('build')
+        yield {'stream': f'Step 1/1 : building {tag} from {path}\n'}
+        time.sleep(self.build_latency)
+        self.register_image(tag if ':' in tag else f'{tag}:latest', labels)
+        yield {'stream': f'Successfully tagged {tag}\n'}
+
+    def exec_create(self, container_reference: str, *_, **__) -> dict:
+        self.record_call('exec_create')
+        self.find_container(container_reference)
+        return {'Id': self.get_new_id()}
+
+    def exec_start(self, *_, **__) -> bytes:
+        self.record_call('exec_start')
+        return b''
+
+    def exec_inspect(self, *_) -> dict:
+        self.record_call('exec_inspect')
+        return {'ExitCode': 0}
+
+
+@dataclasses.dataclass
+class HomeposeFakeObject():
+    attrs: dict
+    client: 'HomeposeFakeDockerClient'
+
+    @property
+    def id(self) -> str:  # pylint: disable=C0103
+        return self.attrs['Id']
+
+    @property
+    def short_id(self) -> str:
+        return self.attrs['Id'].split(':')[-1][:12]
+
+    @property
+    def name(self) -> str:
+        return self.attrs.get('Name', '')
+
+    @property
+    def labels(self) -> dict:
+        return self.attrs.get('Labels') or {}
+
+    @property
+    def tags(self) -> list:
+        return self.attrs.get('RepoTags') or []
+
+    def remove(self, **_) -> None:
+        if 'RepoTags' in self.attrs:
+            self.client.images.remove(self.id)
+        elif 'State' in self.attrs:
+            self.client.api.remove_container(self.id, force=True)
+        else:
+            self.client.api.remove_network(self.id)
+
+
+@dataclasses.dataclass
+class HomeposeFakeCollection():
+    client: 'HomeposeFakeDockerClient'
+    resource_type: str
+
+    def list(self, all: bool = False, filters: typing.Optional[dict] = None, names: typing.Optional[list] = None) -> list:  # pylint: disable=W0622
+        if self.resource_type == 'containers':
+            resources = self.client.api.containers(all=all, filters=filters)
+        elif self.resource_type == 'networks':
+            resources = self.client.api.networks(names=names, filters=filters)
+        else:
+            resources = [
+                image
+                for image in list(self.client.api.images_state.values())
+                if matches_filters(image, filters)
+            ]
+        return [HomeposeFakeObject(resource, self.client) for resource in resources]
+
+    def get(self, reference: str) -> HomeposeFakeObject:
+        if self.resource_type == 'containers':
+            return HomeposeFakeObject(self.client.api.find_container(reference), self.client)
+        if self.resource_type == 'networks':
+            if matching_networks := [network for network in self.client.api.networks() if reference in (network['Id'], network['Name'])]:
+                return HomeposeFakeObject(matching_networks[0], self.client)
+            raise docker.errors.NotFound(f'No such network: {reference}')
+        return HomeposeFakeObject(self.client.api.inspect_image(reference if ':' in reference else f'{reference}:latest'), self.client)
+
+    def create(self, name: str, **kwargs) -> HomeposeFakeObject:
+        return self.get(self.client.api.create_network(name, **kwargs)['Id'])
+
+    def remove(self, reference: str, **_) -> None:
+        with contextlib.suppress(KeyError):
+            for image_name, image in list(self.client.api.images_state.items()):
+                if reference in (image_name, image['Id']):
+                    del self.client.api.images_state[image_name]
+
+
+@dataclasses.dataclass
+class HomeposeFakeDockerClient():
+    api: HomeposeFakeDockerAPI = dataclasses.field(default_factory=HomeposeFakeDockerAPI)
+
+    def __post_init__(self) -> None:
+        self.containers = HomeposeFakeCollection(self, 'containers')
+        self.networks = HomeposeFakeCollection(self, 'networks')
+        self.images = HomeposeFakeCollection(self, 'images')
+
+    def events(self, **_) -> HomeposeFakeEventsStream:
+        return self.api.subscribe()
+
+    @staticmethod
+    def ping() -> bool:
+        return True
+
+
+@dataclasses.dataclass
+class HomeposeFakeCommandRunner():
+    installed_packages: set = dataclasses.field(default_factory=set)
+    commands: list = dataclasses.field(init=False, default_factory=list)
+
+    def run(self, command: list) -> tuple:
+        self.commands.append(list(command))
+        if command[0] == 'dpkg-query':
+            return 0, 'install ok installed' if command[-1] in self.installed_packages else 'unknown ok not-installed'
+        if command[0] == 'apt-get':
+            self.installed_packages |= {argument for argument in command[2:] if not argument.startswith('-')}
+        return 0, ''
+
+
+@dataclasses.dataclass
+class HomeposeSandbox():  # pylint: disable=R0902
+    services: list
+    dependencies: dict = dataclasses.field(default_factory=dict)
+    extra_config: dict = dataclasses.field(default_factory=dict)
+    root_path: str = dataclasses.field(default='')
+    docker_hosts: list = dataclasses.field(default_factory=list)
+
+    client: HomeposeFakeDockerClient = dataclasses.field(init=False, default_factory=HomeposeFakeDockerClient)
+    clients: dict = dataclasses.field(init=False, default_factory=dict)
+    command_runner: HomeposeFakeCommandRunner = dataclasses.field(init=False, default_factory=HomeposeFakeCommandRunner)
+
+    __temporary_folder: typing.Optional[tempfile.TemporaryDirectory] = dataclasses.field(init=False, default=None)
+    __previous_environment: dict = dataclasses.field(init=False, default_factory=dict)
+    __previous_working_directory: str = dataclasses.field(init=False, default='')
+    __previous_docker_clients: dict = dataclasses.field(init=False, default_factory=dict)
+    __previous_privileges_check: typing.Any = dataclasses.field(init=False, default=None)
+
+    def __enter__(self) -> 'HomeposeSandbox':
+        if not self.root_path:
+            self.__temporary_folder = tempfile.TemporaryDirectory(prefix='homepose-sandbox-')  # pylint: disable=R1732
+            self.root_path = self.__temporary_folder.name
+        self.__previous_environment = dict(os.environ)
+        self.__previous_working_directory = os.getcwd()
+        self.create_stack()
+        current_user = pwd.getpwuid(os.getuid())
+        os.environ.update({
+            'SUDO_USER': current_user.pw_name,
+            'SUDO_UID': str(current_user.pw_uid),
+            'SUDO_GID': str(current_user.pw_gid)
+        })
+        os.chdir(self.root_path)
+        self.__previous_privileges_check = vars(homepose.libs.environment.HomeposeDeployEnvironment)['check_privileges']
+        homepose.libs.environment.HomeposeDeployEnvironment.check_privileges = staticmethod(lambda: None)  # type: ignore
+        homepose.libs.environment.HomeposeDeployEnvironment.reset()
+        self.__previous_docker_clients = dict(homepose.libs.compose.DOCKER_CLIENTS)
+        homepose.libs.compose.DOCKER_CLIENTS[''] = self.client
+        for host_name in self.docker_hosts:
+            self.clients[host_name] = self.clients.get(host_name) or HomeposeFakeDockerClient()
+            homepose.libs.compose.DOCKER_CLIENTS[self.get_docker_url(host_name)] = self.clients[host_name]
+        return self
+
+    def __exit__(self, *_) -> None:
+        homepose.libs.compose.DOCKER_CLIENTS.clear()
+        homepose.libs.compose.DOCKER_CLIENTS.update(self.__previous_docker_clients)
+        os.chdir(self.__previous_working_directory)
+        os.environ.clear()
+        os.environ.update(self.__previous_environment)
+        homepose.libs.environment.HomeposeDeployEnvironment.check_privileges = self.__previous_privileges_check  # type: ignore
+        homepose.libs.environment.HomeposeDeployEnvironment.reset()
+        if self.__temporary_folder is not None:
+            self.__temporary_folder.cleanup()
+            self.__temporary_folder = None
+            self.root_path = ''
+
+    def get_config(self) -> dict:
+        return {
+            'BUILD_FOLDER': f'{self.root_path}/stack',
+            'COMPOSE_FILES_FOLDER': f'{self.root_path}/stack/docker',
+            'TEMPLATES_FOLDER': f'{self.root_path}/stack/templates',
+            'GENERATED_FOLDER': f'{self.root_path}/stack/generated',
+            'HOMEPOSE_NAME': 'sandbox',
+            'HOMEPOSE_DOMAIN': 'lan',
+            'HOMEPOSE_HOSTNAME': 'sandboxlab',
+            'HOMEPOSE_DOCKER_NETWORK': 'sandboxnet',
+            'HOSTS_FILE_PATH': f'{self.root_path}/etc/hosts',
+            'DNSMASQ_CONF_PATH': f'{self.root_path}/etc/dnsmasq.conf',
+            'DATABASE_BACKEND': self.services[0],
+            'REVERSE_PROXY_NAME': self.services[-1],
+            'ENABLED_SERVICES': ','.join(self.services[1:-1]),
+            'PERSISTENT_VOLUMES': '',
+            **{f'{service_name.upper()}_PORT': str(8000 + service_index) for service_index, service_name in enumerate(self.services)},
+            **{f'{service_name.upper()}_MOUNT_POINT': f'{self.root_path}/volumes/{service_name}' for service_name in self.services},
+            **self.get_docker_hosts_config(),
+            **self.extra_config
+        }
+
+    def get_docker_hosts_config(self) -> dict:
+        if not self.docker_hosts:
+            return {}
+        hosts_config = {'DOCKER_HOSTS': ','.join(self.docker_hosts)}
+        for host_index, host_name in enumerate(self.docker_hosts):
+            hosts_config[f'{host_name.upper()}_DOCKER_URL'] = self.get_docker_url(host_name)
+            hosts_config[f'{host_name.upper()}_HOST_ADDRESS'] = f'{SANDBOX_HOSTS_NETWORK}.{host_index + 1}'
+        return hosts_config
+
+    @staticmethod
+    def get_docker_url(host_name: str) -> str:
+        return f'sandbox://{host_name}'
+
+    def create_stack(self) -> None:
+        for folder in ('stack/docker', 'stack/templates/configs', 'stack/templates/dockerfiles', 'stack/generated/configs', 'stack/generated/dockerfiles', 'etc'):
+            os.makedirs(f'{self.root_path}/{folder}', exist_ok=True)
+        for service_name in self.services:
+            os.makedirs(f'{self.root_path}/stack/docker/{service_name}', exist_ok=True)
+            with open(f'{self.root_path}/stack/docker/{service_name}/docker-compose.yml', 'w', encoding='utf-8') as compose_file:
+                yaml.safe_dump(self.get_compose_definition(service_name), compose_file)
+        with open(f'{self.root_path}/stack/templates/configs/dnsmasq.conf', 'w', encoding='utf-8') as dnsmasq_template:
+            dnsmasq_template.write('domain=[HOMEPOSE_HOSTNAME].[HOMEPOSE_DOMAIN]\nexpand-hosts\n')
+        with open(f'{self.root_path}/stack/templates/configs/{homepose.libs.vars.PROXY_LOCATION_TEMPLATE}', 'w', encoding='utf-8') as location_template:
+            location_template.write('location ~ ^/[SERVICE_NAME](/.*)?$ {\n    proxy_pass http://[SERVICE_ADDRESS]:[SERVICE_PORT]$1$is_args$args;\n}\n')
+        with open(f'{self.root_path}/etc/hosts', 'w', encoding='utf-8') as hosts_file:
+            hosts_file.write('127.0.0.1 localhost\n')
+        with open(f'{self.root_path}/config.ini', 'w', encoding='utf-8') as config_file:
+            config_file.write('[SANDBOX]\n')
+            config_file.writelines(f'{setting_name}={setting}\n' for setting_name, setting in self.get_config().items())
+
+    def get_compose_definition(self, service_name: str) -> dict:
+        return {
+            'version': '3.7',
+            'services': {
+                service_name: {
+                    'image': f'sandbox/{service_name}:latest',
+                    'container_name': service_name,
+                    'networks': ['shared-network'],
+                    'depends_on': sorted(self.dependencies.get(service_name, []))
+                }
+            },
+            'networks': {'shared-network': {'external': True, 'name': '${HOMEPOSE_DOCKER_NETWORK}'}}
+        }
+
+    def attach(self, networking: typing.Any) -> None:
+        networking.command_runner = self.command_runner
+        networking.host_ip_address = SANDBOX_HOST_ADDRESS
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+
+import contextlib
+import dataclasses
+import json
+import os
+import shutil
+import signal
+import socket
+import socketserver
+import sys
+import threading
+import typing
+
+import homepose.libs.utils
+import homepose.libs.vars
+import homepose.libs.watcher
+import homepose.main
+
+
+class HomeposeControlHandler(socketserver.StreamRequestHandler):
+    server: 'HomeposeControlServer'
+
+    def handle(self) -> None:
+        for request_line in self.rfile:
+            if not request_line.strip():
+                continue
+            response = self.server.homepose_daemon.handle_request(request_line)
+            self.wfile.write(json.dumps(response, sort_keys=True).encode('utf-8') + b'\n')
+            self.wfile.flush()
+
+
+class HomeposeControlServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path: str, homepose_daemon: 'HomeposeDaemon') -> None:
+        self.homepose_daemon = homepose_daemon
+        super().__init__(socket_path, HomeposeControlHandler)
+
+
+@dataclasses.dataclass
+class HomeposeDaemon():
+    socket_path: str = dataclasses.field(default='')
+    instance: homepose.main.HomeposeInstance = dataclasses.field(init=False, default_factory=homepose.main.HomeposeInstance)
+    logging: homepose.libs.utils.HomeposeLogger = dataclasses.field(init=False, default_factory=homepose.libs.utils.HomeposeLogger)
+    watcher: homepose.libs.watcher.HomeposeWatcher = dataclasses.field(init=False)
+
+    __service_locks: dict = dataclasses.field(init=False, default_factory=dict)
+    __locks_lock: threading.Lock = dataclasses.field(init=False, default_factory=threading.Lock)
+
+    def __post_init__(self) -> None:
+        self.socket_path = self.socket_path or self.instance.enviroment['DAEMON_SOCKET_PATH'] or get_socket_path()
+        self.watcher = homepose.libs.watcher.HomeposeWatcher(
+            self.instance.deployment,
+            self.instance.networking,
+            self.instance.get_advertised_services,
+            self.instance.reload_config,
+            float(self.instance.enviroment['WATCHER_DEBOUNCE_SECONDS'] or homepose.libs.vars.WATCHER_DEBOUNCE_SECONDS)
+        )
+
+    def get_commands(self) -> dict:
+        return {
+            'ping': lambda _: 'pong',
+            'status': lambda request: self.instance.get_status(request.get('service', '')),
+            'start': lambda request: self.run_for_service(request, self.instance.start_service),
+            'stop': lambda request: self.run_for_service(request, self.instance.stop_service),
+            'restart': lambda request: self.run_for_service(request, self.instance.restart_service),
+            'rolling_restart': self.rolling_restart,
+            'add_gateway': self.add_gateway,
+            'gateways': lambda _: self.instance.networking.get_gateways(),
+            'reload': self.reload_config
+        }
+
+    def get_service_lock(self, service_name: str) -> threading.Lock:
+        with self.__locks_lock:
+            return self.__service_locks.setdefault(service_name, threading.Lock())
+
+    def run_for_service(self, request: dict, operation: typing.Callable[[str], None]) -> str:
+        if not (service_name := request.get('service')):
+            raise shutil.ExecError('Request is missing the "service" field!')
+        with self.get_service_lock(service_name):
+            operation(service_name)
+        return service_name
+
+    def rolling_restart(self, _: dict) -> list:
+        services_locks = [self.get_service_lock(service_name) for service_name in sorted(self.instance.get_services())]
+        with contextlib.ExitStack() as locks_stack:
+            for service_lock in services_locks:
+                locks_stack.enter_context(service_lock)
+            self.instance.rolling_restart()
+        return self.instance.get_services()
+
+    def add_gateway(self, request: dict) -> dict:
+        if not request.get('address') or not request.get('name'):
+            raise shutil.ExecError('Request has to contain "address" and "name" fields!')
+        self.instance.add_external_service(request['address'], request['name'])
+        self.instance.networking.broadcast_gateways(self.instance.get_advertised_services())
+        return self.instance.networking.get_gateways()
+
+    def reload_config(self, _: dict) -> list:
+        self.instance.reload_config()
+        return self.instance.get_services()
+
+    def handle_request(self, request_line: bytes) -> dict:
+        try:
+            request = json.loads(request_line)
+            if not isinstance(request, dict):
+                raise ValueError('Request has to be a JSON object!')
+            command = self.get_commands().get(request.get('command', ''))
+            if command is None:
+                raise ValueError(f'Unknown command: {request.get("command")}')
+            return {'ok': True, 'result': command(request)}
+        except Exception as encountered_exception:  # pylint: disable=W0703
+            self.logging.error(f' Control request failed: {encountered_exception}')
+            return {'ok': False, 'error': str(encountered_exception)}
+
+    def warm_up(self) -> None:
+        self.logging.info('Warming up Homepose daemon')
+        self.instance.networking.export_host_variables()
+        self.instance.networking.hosts_file.read()
+        for client in self.instance.deployment.get_clients().values():
+            client.ping()
+
+    def serve(self) -> None:
+        self.warm_up()
+        self.remove_stale_socket()
+        previous_umask = os.umask(0o177)
+        try:
+            control_server = HomeposeControlServer(self.socket_path, self)
+        finally:
+            os.umask(previous_umask)
+        with control_server:
+            if threading.current_thread() is threading.main_thread():
+                signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+            self.logging.info(f'Listening for control requests on {self.socket_path}')
+            self.watcher.start()
+            try:
+                control_server.serve_forever()
+            finally:
+                self.watcher.stop()
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(self.socket_path)
+
+    def remove_stale_socket(self) -> None:
+        if not os.path.exists(self.socket_path):
+            return
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe_socket:
+            try:
+                probe_socket.connect(self.socket_path)
+            except OSError:
+                os.remove(self.socket_path)
+                return
+        raise shutil.ExecError(f'Another Homepose daemon is already listening on {self.socket_path}!')
+
+
+def get_socket_path() -> str:
+    return os.environ.get('HOMEPOSE_DAEMON_SOCKET', homepose.libs.vars.DEFAULT_DAEMON_SOCKET_PATH)
+
+
+def send_request(request: dict, socket_path: str = '') -> dict:
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as control_socket:
+        control_socket.connect(socket_path or get_socket_path())
+        control_socket.sendall(json.dumps(request).encode('utf-8') + b'\n')
+        with control_socket.makefile('rb') as response_file:
+            return json.loads(response_file.readline())
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        HomeposeDaemon().serve()
+    else:
+        command_arguments = dict(zip(
+            ('address', 'name') if sys.argv[1] == 'add_gateway' else ('service',),
+            sys.argv[2:]
+        ))
+        control_response = send_request({'command': sys.argv[1], **command_arguments})
+        print(json.dumps(control_response, indent=2, sort_keys=True))
+        sys.exit(0 if control_response.get('ok') else 1)
@@ -0,0 +1,455 @@
+import concurrent.futures
+import contextlib
+import dataclasses
+import logging
+import os
+import re
+import shutil
+import threading
+import typing
+
+import dotenv
+import docker  # type: ignore
+import yaml  # type: ignore
+
+import homepose.libs.processes
+import homepose.libs.timing
+import homepose.libs.utils
+import homepose.libs.vars
+
+
+COMPOSE_VARIABLE_PATTERN = re.compile(r'\$(?:(\$)|\{([A-Za-z_][A-Za-z0-9_]*)(?:(:?[-?])([^}]*))?\}|([A-Za-z_][A-Za-z0-9_]*))')
+DURATION_PATTERN = re.compile(r'(\d+(?:\.\d+)?)(us|ms|s|m|h)')
+DURATION_UNITS_IN_NANOSECONDS = {
+    'us': 10 ** 3,
+    'ms': 10 ** 6,
+    's': 10 ** 9,
+    'm': 60 * 10 ** 9,
+    'h': 3600 * 10 ** 9
+}
+SUPPORTED_SERVICE_KEYS = {
+    'build', 'cap_add', 'cap_drop', 'command', 'container_name', 'depends_on', 'dns', 'domainname', 'entrypoint',
+    'env_file', 'environment', 'expose', 'extra_hosts', 'healthcheck', 'hostname', 'image', 'labels', 'networks',
+    'ports', 'privileged', 'restart', 'shm_size', 'stdin_open', 'tty', 'user', 'volumes', 'working_dir'
+}
+
+DOCKER_CLIENT_LOCK = threading.Lock()
+DOCKER_CLIENTS: dict = {}
+COMPOSE_FILES_LOCK = threading.Lock()
+COMPOSE_FILES: dict = {}
+
+
+def get_docker_client(base_url: str = '') -> docker.client.DockerClient:
+    with DOCKER_CLIENT_LOCK:
+        if base_url not in DOCKER_CLIENTS:
+            DOCKER_CLIENTS[base_url] = docker.DockerClient(base_url=base_url) if base_url else docker.from_env()
+        return DOCKER_CLIENTS[base_url]
+
+
+def read_compose_file(compose_file_path: str) -> dict:
+    compose_file_stats = os.stat(compose_file_path)
+    cache_key = (compose_file_stats.st_mtime_ns, compose_file_stats.st_size)
+    with COMPOSE_FILES_LOCK:
+        cached_entry = COMPOSE_FILES.get(compose_file_path)
+    if cached_entry and cached_entry[0] == cache_key:
+        return cached_entry[1]
+    with open(compose_file_path, 'r', encoding='utf-8') as compose_file:
+        compose_definition = yaml.safe_load(compose_file) or {}
+    with COMPOSE_FILES_LOCK:
+        COMPOSE_FILES[compose_file_path] = (cache_key, compose_definition)
+    return compose_definition
+
+
+def interpolate(value: typing.Any, variables: typing.Mapping[str, str]) -> typing.Any:
+    if isinstance(value, dict):
+        return {key: interpolate(item, variables) for key, item in value.items()}
+    if isinstance(value, list):
+        return [interpolate(item, variables) for item in value]
+    if not isinstance(value, str):
+        return value
+
+    def substitute(match: re.Match) -> str:
+        escaped_dollar, braced_name, operator, argument, bare_name = match.groups()
+        if escaped_dollar:
+            return '$'
+        variable_name = braced_name or bare_name
+        variable_value = variables.get(variable_name)
+        if operator in (':-', ':?') and not variable_value:
+            variable_value = None
+        if variable_value is not None:
+            return variable_value
+        if operator and operator.endswith('?'):
+            raise shutil.ExecError(f'Required variable {variable_name} is missing: {argument}')
+        if operator and operator.endswith('-'):
+            return interpolate(argument, variables)
+        return ''
+
+    return COMPOSE_VARIABLE_PATTERN.sub(substitute, value)
+
+
+def parse_duration(duration: typing.Union[str, int, None]) -> typing.Optional[int]:
+    if duration is None:
+        return None
+    if isinstance(duration, int):
+        return duration * DURATION_UNITS_IN_NANOSECONDS['s']
+    return int(sum(
+        float(amount) * DURATION_UNITS_IN_NANOSECONDS[unit]
+        for amount, unit in DURATION_PATTERN.findall(duration)
+    ))
+
+
+def split_image_name(image_name: str) -> typing.Tuple[str, str]:
+    repository, separator, tag = image_name.rpartition(':')
+    if not separator or '/' in tag:
+        return image_name, 'latest'
+    return repository, tag
+
+
+def to_key_value_list(entries: typing.Union[list, dict, None], variables: typing.Mapping[str, str]) -> list:
+    if isinstance(entries, dict):
+        return [f'{key}={"" if value is None else value}' for key, value in entries.items()]
+    key_value_list = []
+    for entry in entries or []:
+        entry = str(entry)
+        if '=' not in entry:
+            if entry in variables:
+                key_value_list.append(f'{entry}={variables[entry]}')
+            continue
+        key_value_list.append(entry)
+    return key_value_list
+
+
+def to_labels_dict(labels: typing.Union[list, dict, None]) -> dict:
+    if isinstance(labels, dict):
+        return {str(key): str(value) for key, value in labels.items()}
+    labels_dict = {}
+    for label in labels or []:
+        label_name, _, label_value = str(label).partition('=')
+        labels_dict[label_name] = label_value
+    return labels_dict
+
+
+@dataclasses.dataclass
+class HomeposeComposeProject():
+    name: str
+    path: str
+    definition: dict
+
+    def get_services(self) -> dict:
+        return self.definition.get('services') or {}
+
+    def get_ordered_services(self) -> list:
+        services = self.get_services()
+        ordered_services: list = []
+        while len(ordered_services) < len(services):
+            ready_services = [
+                service_key
+                for service_key, service in services.items()
+                if service_key not in ordered_services
+                and all(
+                    dependency in ordered_services or dependency not in services
+                    for dependency in (service or {}).get('depends_on') or []
+                )
+            ]
+            if not ready_services:
+                raise shutil.ExecError(f'Circular depends_on entries found in {self.path}')
+            ordered_services.extend(ready_services)
+        return ordered_services
+
+    def get_container_name(self, service_key: str) -> str:
+        return (self.get_services()[service_key] or {}).get('container_name') or f'{self.name}_{service_key}_1'
+
+    def get_network_name(self, network_key: str) -> str:
+        network = (self.definition.get('networks') or {}).get(network_key) or {}
+        if network.get('name'):
+            return network['name']
+        return network_key if network.get('external') else f'{self.name}_{network_key}'
+
+    def get_volume_name(self, volume_key: str) -> str:
+        volume = (self.definition.get('volumes') or {}).get(volume_key) or {}
+        if volume.get('name'):
+            return volume['name']
+        return volume_key if volume.get('external') else f'{self.name}_{volume_key}'
+
+    def get_labels(self, service_key: str = '') -> dict:
+        labels = {
+            homepose.libs.vars.COMPOSE_PROJECT_LABEL: self.name,
+            homepose.libs.vars.HOMEPOSE_SERVICE_LABEL: self.name
+        }
+        if service_key:
+            labels[homepose.libs.vars.COMPOSE_SERVICE_LABEL] = service_key
+        return labels
+
+
+@dataclasses.dataclass
+class HomeposeComposeExecutor():
+    client: docker.client.DockerClient = dataclasses.field(default_factory=get_docker_client)
+    output_log_level: int = dataclasses.field(default=logging.DEBUG)
+    output_tail_size: int = dataclasses.field(default=homepose.libs.vars.DEFAULT_OUTPUT_TAIL_LINES)
+
+    @staticmethod
+    def load_project(compose_file_path: str, project_name: str = '') -> HomeposeComposeProject:
+        project_path = os.path.dirname(os.path.abspath(compose_file_path))
+        dot_env_file_path = f'{project_path}/.env'
+        variables: dict = {
+            **(dotenv.dotenv_values(dot_env_file_path) if os.path.exists(dot_env_file_path) else {}),
+            **os.environ
+        }
+        return HomeposeComposeProject(
+            project_name or os.path.basename(project_path).lower(),
+            project_path,
+            interpolate(read_compose_file(compose_file_path), variables)
+        )
+
+    def compose_up(self, project: HomeposeComposeProject, logger: homepose.libs.utils.HomeposeServiceLogger) -> None:
+        for network_key in project.definition.get('networks') or {}:
+            self.ensure_network(project, network_key)
+        for volume_key in project.definition.get('volumes') or {}:
+            self.ensure_volume(project, volume_key)
+        for service_key in project.get_ordered_services():
+            self.run_service(project, service_key, logger)
+
+    def compose_down_projects(self, projects_names: typing.Optional[list] = None, logger: typing.Optional[homepose.libs.utils.HomeposeServiceLogger] = None) -> list:
+        projects_containers = self.get_projects_resources(self.client.api.containers, projects_names, all=True)
+        with concurrent.futures.ThreadPoolExecutor(max_workers=homepose.libs.vars.DEFAULT_REMOVAL_WORKERS) as removal_executor:
+            list(removal_executor.map(lambda container: self.remove_container(container, logger), projects_containers))
+        for network in self.get_projects_resources(self.client.api.networks, projects_names):
+            with contextlib.suppress(docker.errors.NotFound, docker.errors.APIError):
+                self.client.api.remove_network(network['Id'])
+        return projects_containers
+
+    @staticmethod
+    def get_projects_resources(list_resources: typing.Callable, projects_names: typing.Optional[list] = None, **list_kwargs) -> list:
+        projects_labels = [homepose.libs.vars.HOMEPOSE_SERVICE_LABEL]
+        if projects_names is not None:
+            projects_labels.append(homepose.libs.vars.COMPOSE_PROJECT_LABEL)
+        projects_resources: dict = {}
+        for label in projects_labels:
+            for resource in list_resources(filters={'label': label}, **list_kwargs):
+                if projects_names is None or (resource.get('Labels') or {}).get(label) in projects_names:
+                    projects_resources[resource['Id']] = resource
+        return list(projects_resources.values())
+
+    def remove_container(self, container: dict, logger: typing.Optional[homepose.libs.utils.HomeposeServiceLogger] = None) -> None:
+        if logger:
+            logger.info(f'  Removing container {container["Names"][0].lstrip("/")}')
+        with contextlib.suppress(docker.errors.NotFound):
+            self.client.api.remove_container(container['Id'], force=True)
+
+    def ensure_network(self, project: HomeposeComposeProject, network_key: str) -> None:
+        network = (project.definition.get('networks') or {}).get(network_key) or {}
+        network_name = project.get_network_name(network_key)
+        if any(existing_network['Name'] == network_name for existing_network in self.client.api.networks(names=[network_name])):
+            return
+        self.client.api.create_network(
+            network_name,
+            driver=network.get('driver'),
+            options=network.get('driver_opts'),
+            labels=None if network.get('external') else {**to_labels_dict(network.get('labels')), **project.get_labels()}
+        )
+
+    def ensure_volume(self, project: HomeposeComposeProject, volume_key: str) -> None:
+        volume = (project.definition.get('volumes') or {}).get(volume_key) or {}
+        volume_name = project.get_volume_name(volume_key)
+        with contextlib.suppress(docker.errors.NotFound):
+            self.client.api.inspect_volume(volume_name)
+            return
+        if volume.get('external'):
+            raise shutil.ExecError(f'External volume {volume_name} does not exist!')
+        self.client.api.create_volume(
+            volume_name,
+            driver=volume.get('driver', 'local'),
+            driver_opts={key: str(value) for key, value in (volume.get('driver_opts') or {}).items()} or None,
+            labels={**to_labels_dict(volume.get('labels')), **project.get_labels()}
+        )
+
+    def ensure_image(self, project: HomeposeComposeProject, service_key: str, logger: homepose.libs.utils.HomeposeServiceLogger) -> str:
+        service = project.get_services()[service_key] or {}
+        image_name = service.get('image') or f'{project.name}_{service_key}'
+        if build := service.get('build'):
+            build = build if isinstance(build, dict) else {'context': build}
+            self.build_image(
+                os.path.join(project.path, build.get('context', '.')),
+                image_name,
+                f'{project.path}/{service_key}_build.log',
+                logger,
+                dockerfile=build.get('dockerfile'),
+                buildargs={key: str(value) for key, value in to_labels_dict(build.get('args')).items()} or None
+            )
+            return image_name
+        with contextlib.suppress(docker.errors.ImageNotFound):
+            self.client.api.inspect_image(image_name)
+            return image_name
+        logger.info(f'  Pulling image {image_name} ...')
+        repository, tag = split_image_name(image_name)
+        self.stream_output(
+            self.client.api.pull(repository, tag=tag, stream=True, decode=True),
+            f'{project.path}/{service_key}_pull.log',
+            logger
+        )
+        return image_name
+
+    def build_image(self, context_path: str, image_tag: str, logpath: str, logger: homepose.libs.utils.HomeposeServiceLogger, **build_kwargs) -> None:
+        logger.info(f'  Building image {image_tag} ...')
+        self.stream_output(
+            self.client.api.build(path=context_path, tag=image_tag, rm=True, decode=True, **build_kwargs),
+            logpath,
+            logger
+        )
+
+    def stream_output(self, output_chunks: typing.Iterable[dict], logpath: str, logger: homepose.libs.utils.HomeposeServiceLogger) -> None:
+        output_sink = homepose.libs.processes.HomeposeOutputSink(logpath, logger, self.output_log_level, self.output_tail_size)
+        try:
+            with output_sink:
+                for chunk in output_chunks:
+                    if 'error' in chunk:
+                        output_sink.write_line(chunk['error'])
+                        raise shutil.ExecError(f'{chunk["error"].strip()}\n{output_sink.get_tail()}')
+                    if 'stream' in chunk:
+                        output_sink.write_line(chunk['stream'])
+                    elif 'status' in chunk:
+                        output_sink.write_line(f'{chunk.get("id", "")} {chunk["status"]} {chunk.get("progress", "")}'.strip())
+        finally:
+            homepose.libs.timing.TIMER.record_output(output_sink.output_bytes)
+
+    def run_service(self, project: HomeposeComposeProject, service_key: str, logger: homepose.libs.utils.HomeposeServiceLogger) -> str:
+        service = project.get_services()[service_key] or {}
+        if set(service) - SUPPORTED_SERVICE_KEYS:
+            logger.warning(f'  Unsupported keys of {service_key} are ignored: {", ".join(sorted(set(service) - SUPPORTED_SERVICE_KEYS))}')
+        image_name = self.ensure_image(project, service_key, logger)
+        container_name = project.get_container_name(service_key)
+        with contextlib.suppress(docker.errors.NotFound):
+            self.client.api.remove_container(container_name, force=True)
+
+        networks_names = self.get_networks_aliases(project, service_key)
+        primary_network_name = next(iter(networks_names))
+        exposed_ports, port_bindings = self.parse_ports(service.get('ports') or [], service.get('expose') or [])
+        binds, anonymous_volumes = self.parse_volumes(project, service.get('volumes') or [])
+
+        container = self.client.api.create_container(
+            image_name,
+            name=container_name,
+            command=service.get('command'),
+            entrypoint=service.get('entrypoint'),
+            hostname=service.get('hostname'),
+            domainname=service.get('domainname'),
+            user=service.get('user'),
+            working_dir=service.get('working_dir'),
+            stdin_open=bool(service.get('stdin_open')),
+            tty=bool(service.get('tty')),
+            environment=self.get_environment(project, service_key),
+            ports=exposed_ports,
+            volumes=anonymous_volumes + [bind['bind'] for bind in binds.values()],
+            labels={**to_labels_dict(service.get('labels')), **project.get_labels(service_key)},
+            healthcheck=self.parse_healthcheck(service.get('healthcheck')),
+            host_config=self.client.api.create_host_config(
+                binds=binds,
+                port_bindings=port_bindings,
+                restart_policy=self.parse_restart_policy(service.get('restart')),
+                network_mode=primary_network_name,
+                privileged=bool(service.get('privileged')),
+                cap_add=service.get('cap_add'),
+                cap_drop=service.get('cap_drop'),
+                dns=service.get('dns'),
+                extra_hosts=service.get('extra_hosts'),
+                shm_size=service.get('shm_size')
+            ),
+            networking_config=self.client.api.create_networking_config({
+                primary_network_name: self.client.api.create_endpoint_config(aliases=networks_names[primary_network_name])
+            })
+        )
+        for secondary_network_name in list(networks_names)[1:]:
+            self.client.api.connect_container_to_network(container['Id'], secondary_network_name, aliases=networks_names[secondary_network_name])
+        logger.info(f'  Starting container {container_name}')
+        self.client.api.start(container['Id'])
+        return container['Id']
+
+    def get_networks_aliases(self, project: HomeposeComposeProject, service_key: str) -> dict:
+        networks = (project.get_services()[service_key] or {}).get('networks') or ['default']
+        networks = networks if isinstance(networks, dict) else {network_key: None for network_key in networks}
+        if 'default' in networks and 'default' not in (project.definition.get('networks') or {}):
+            project.definition.setdefault('networks', {})['default'] = {}
+            self.ensure_network(project, 'default')
+        return {
+            project.get_network_name(network_key): [service_key, *((network_settings or {}).get('aliases') or [])]
+            for network_key, network_settings in networks.items()
+        }
+
+    @staticmethod
+    def get_environment(project: HomeposeComposeProject, service_key: str) -> list:
+        service = project.get_services()[service_key] or {}
+        variables = dict(os.environ)
+        env_files = service.get('env_file') or []
+        return [
+            entry
+            for env_file in ([env_files] if isinstance(env_files, str) else env_files)
+            for entry in to_key_value_list(dotenv.dotenv_values(os.path.join(project.path, env_file)), variables)
+        ] + to_key_value_list(service.get('environment'), variables)
+
+    @staticmethod
+    def parse_ports(ports: list, exposed: list) -> typing.Tuple[list, dict]:
+        exposed_ports: list = []
+        port_bindings: dict = {}
+        for port, is_published in [*((port, True) for port in ports), *((port, False) for port in exposed)]:
+            port_definition, _, protocol = str(port).partition('/')
+            protocol = protocol or 'tcp'
+            *host_parts, container_port = port_definition.split(':')
+            container_port_key = f'{container_port}/{protocol}'
+            exposed_ports.append((int(container_port), protocol) if protocol != 'tcp' else int(container_port))
+            if not is_published:
+                continue
+            if not host_parts:
+                port_bindings[container_port_key] = None
+            elif len(host_parts) == 1:
+                port_bindings[container_port_key] = int(host_parts[0]) if host_parts[0] else None
+            else:
+                port_bindings[container_port_key] = (host_parts[0], int(host_parts[1]) if host_parts[1] else None)
+        return exposed_ports, port_bindings
+
+    @staticmethod
+    def parse_volumes(project: HomeposeComposeProject, volumes: list) -> typing.Tuple[dict, list]:
+        binds: dict = {}
+        anonymous_volumes: list = []
+        for volume in volumes:
+            if isinstance(volume, dict):
+                source, target = volume.get('source'), volume['target']
+                mode = 'ro' if volume.get('read_only') else 'rw'
+            else:
+                source, _, target = str(volume).partition(':')
+                target, _, mode = target.partition(':')
+                if not target:
+                    source, target = None, source
+            if not source:
+                anonymous_volumes.append(target)
+                continue
+            if source.startswith(('/', '.', '~')):
+                source = os.path.abspath(os.path.join(project.path, os.path.expanduser(source)))
+            else:
+                source = project.get_volume_name(source)
+            binds[source] = {'bind': target, 'mode': mode or 'rw'}
+        return binds, anonymous_volumes
+
+    @staticmethod
+    def parse_restart_policy(restart: typing.Optional[str]) -> typing.Optional[dict]:
+        if not restart or restart == 'no':
+            return None
+        policy_name, _, maximum_retry_count = restart.partition(':')
+        restart_policy: dict = {'Name': policy_name}
+        if maximum_retry_count:
+            restart_policy['MaximumRetryCount'] = int(maximum_retry_count)
+        return restart_policy
+
+    @staticmethod
+    def parse_healthcheck(healthcheck: typing.Optional[dict]) -> typing.Optional[dict]:
+        if not healthcheck:
+            return None
+        if healthcheck.get('disable'):
+            return {'test': ['NONE']}
+        test = healthcheck.get('test')
+        return {
+            'test': ['CMD-SHELL', test] if isinstance(test, str) else test,
+            'interval': parse_duration(healthcheck.get('interval')),
+            'timeout': parse_duration(healthcheck.get('timeout')),
+            'retries': healthcheck.get('retries'),
+            'start_period': parse_duration(healthcheck.get('start_period'))
+        }
@@ -1,129 +1,563 @@
 #!/usr/bin/env python3
 
+import concurrent.futures
 import contextlib
 import dataclasses
+import logging
 import os
 import shutil
-import subprocess
+import socket
+import threading
+import time
+import typing
+import urllib.error
+import urllib.parse
+import urllib.request
 
 import dotenv
 import docker  # type: ignore
 
 import homepose.libs.vars
+import homepose.libs.compose
 import homepose.libs.environment
+import homepose.libs.images
+import homepose.libs.placement
+import homepose.libs.processes
+import homepose.libs.scheduling
+import homepose.libs.state
+import homepose.libs.templating
+import homepose.libs.timing
 import homepose.libs.utils
 
 
 @dataclasses.dataclass
-class HomeposeDeployment():
+class HomeposeReadinessProbe():
+    service_name: str
+    client: docker.client.DockerClient
+    tcp_address: str = dataclasses.field(default='')
+    http_url: str = dataclasses.field(default='')
+    timeout: float = dataclasses.field(default=homepose.libs.vars.DEFAULT_READINESS_TIMEOUT)
+
+    __deadline: float = dataclasses.field(init=False, default=0.0)
+
+    def wait(self) -> float:
+        started_at = time.monotonic()
+        self.__deadline = started_at + self.timeout
+        self.wait_for_health()
+        if self.tcp_address:
+            self.wait_with_backoff(self.is_tcp_port_open, f'TCP port {self.tcp_address}')
+        if self.http_url:
+            self.wait_with_backoff(self.is_http_endpoint_up, f'HTTP endpoint {self.http_url}')
+        return time.monotonic() - started_at
+
+    def validate(self) -> None:
+        if self.tcp_address:
+            _, _, port = self.tcp_address.rpartition(':')
+            if not port.isdigit() or not 0 < int(port) < 65536:
+                raise shutil.ExecError(f'TCP readiness probe of {self.service_name} has to be given as host:port, got "{self.tcp_address}"')
+        if self.http_url:
+            parsed_url = urllib.parse.urlsplit(self.http_url)
+            if parsed_url.scheme not in ('http', 'https') or not parsed_url.netloc:
+                raise shutil.ExecError(f'HTTP readiness probe of {self.service_name} has to be an http(s) URL, got "{self.http_url}"')
+
+    def get_remaining_time(self) -> float:
+        return self.__deadline - time.monotonic()
+
+    def get_unhealthy_containers(self) -> list:
+        unhealthy_containers = []
+        for container in self.client.api.containers(all=True, filters={'label': f'{homepose.libs.vars.COMPOSE_PROJECT_LABEL}={self.service_name}'}):
+            container_state = self.client.api.inspect_container(container['Id'])['State']
+            if container_state['Status'] in ('exited', 'dead'):
+                raise shutil.ExecError(f'Container {container["Names"][0].lstrip("/")} of {self.service_name} exited with code {container_state["ExitCode"]}')
+            if container_state.get('Health', {}).get('Status', 'healthy') != 'healthy' or not container_state['Running']:
+                unhealthy_containers.append(container['Id'])
+        return unhealthy_containers
+
+    def wait_for_health(self) -> None:
+        subscribed_at = int(time.time())
+        unhealthy_containers = self.get_unhealthy_containers()
+        while unhealthy_containers:
+            if self.get_remaining_time() <= 0:
+                raise shutil.ExecError(f'Containers of {self.service_name} did not become healthy within {self.timeout} seconds')
+            events = self.client.events(
+                since=subscribed_at,
+                until=int(time.time() + self.get_remaining_time()) + 1,
+                filters={'type': 'container', 'container': unhealthy_containers},
+                decode=True
+            )
+            try:
+                for event in events:
+                    if event.get('status', '').startswith(homepose.libs.vars.READINESS_EVENTS_PREFIXES):
+                        break
+            finally:
+                events.close()
+            subscribed_at = int(time.time())
+            unhealthy_containers = self.get_unhealthy_containers()
+
+    def wait_with_backoff(self, check: typing.Callable[[], bool], description: str) -> None:
+        delay = homepose.libs.vars.READINESS_INITIAL_BACKOFF
+        while not check():
+            if self.get_remaining_time() <= 0:
+                raise shutil.ExecError(f'{description} of {self.service_name} was not ready within {self.timeout} seconds')
+            time.sleep(min(delay, max(self.get_remaining_time(), 0)))
+            delay = min(delay * 2, homepose.libs.vars.READINESS_MAXIMAL_BACKOFF)
+
+    def is_tcp_port_open(self) -> bool:
+        host, _, port = self.tcp_address.rpartition(':')
+        try:
+            with socket.create_connection((host or 'localhost', int(port)), timeout=homepose.libs.vars.READINESS_CONNECTION_TIMEOUT):
+                return True
+        except OSError:
+            return False
+
+    def is_http_endpoint_up(self) -> bool:
+        try:
+            with urllib.request.urlopen(self.http_url, timeout=homepose.libs.vars.READINESS_CONNECTION_TIMEOUT) as response:  # nosec
+                return response.status < 500
+        except urllib.error.HTTPError as encountered_error:
+            return encountered_error.code < 500
+        except (OSError, ValueError):
+            return False
+
+
+@dataclasses.dataclass
+class HomeposeDeployment():  # pylint: disable=R0904
     enviroment: homepose.libs.environment.HomeposeDeployEnvironment = dataclasses.field(init=False, default_factory=homepose.libs.environment.HomeposeDeployEnvironment)
-    __logger: homepose.libs.utils.HomeposeLogger = dataclasses.field(init=False)
-    __instance: docker.client.DockerClient = dataclasses.field(default_factory=docker.from_env)
-    __current_service_name: str = dataclasses.field(init=False, default='')
-    __service_compose_path: str = dataclasses.field(init=False, default='')
+    readiness_report: dict = dataclasses.field(init=False, default_factory=dict)
+
+    __compose_executors: dict = dataclasses.field(init=False, default_factory=dict)
+    __executors_lock: threading.Lock = dataclasses.field(init=False, default_factory=threading.Lock)
+    __state_lock: threading.Lock = dataclasses.field(init=False, default_factory=threading.Lock)
+
+    @property
+    def placement(self) -> homepose.libs.placement.HomeposePlacement:
+        return self.enviroment.placement
+
+    @property
+    def client(self) -> docker.client.DockerClient:
+        return self.get_host_client(self.placement.get_primary_host())
+
+    @property
+    def output_log_level(self) -> int:
+        return logging.getLevelName(str(self.enviroment['OUTPUT_LOG_LEVEL'] or homepose.libs.vars.DEFAULT_OUTPUT_LOG_LEVEL).upper())
+
+    @property
+    def output_tail_size(self) -> int:
+        return int(self.enviroment['OUTPUT_TAIL_LINES'] or homepose.libs.vars.DEFAULT_OUTPUT_TAIL_LINES)
+
+    @staticmethod
+    def get_host_client(host: homepose.libs.placement.HomeposeDockerHost) -> docker.client.DockerClient:
+        return homepose.libs.compose.get_docker_client(host.docker_url)
+
+    def get_clients(self) -> dict:
+        return {host_name: self.get_host_client(host) for host_name, host in self.placement.hosts.items()}
+
+    def get_client(self, service_name: str) -> docker.client.DockerClient:
+        return self.get_host_client(self.placement.get_host(service_name))
+
+    def get_host_compose(self, host: homepose.libs.placement.HomeposeDockerHost) -> homepose.libs.compose.HomeposeComposeExecutor:
+        with self.__executors_lock:
+            if host.docker_url not in self.__compose_executors:
+                self.__compose_executors[host.docker_url] = homepose.libs.compose.HomeposeComposeExecutor(
+                    self.get_host_client(host),
+                    self.output_log_level,
+                    self.output_tail_size
+                )
+            return self.__compose_executors[host.docker_url]
+
+    def get_compose(self, service_name: str) -> homepose.libs.compose.HomeposeComposeExecutor:
+        return self.get_host_compose(self.placement.get_host(service_name))
+
+    def get_image_cache(self, service_name: str) -> homepose.libs.images.HomeposeImageCache:
+        return homepose.libs.images.HomeposeImageCache(self.get_client(service_name))
+
+    def run_on_hosts(self, operation: typing.Callable[[homepose.libs.placement.HomeposeDockerHost], typing.Any]) -> dict:
+        hosts = list(self.placement.hosts.values())
+        if len(hosts) == 1:
+            return {hosts[0].name: operation(hosts[0])}
+        with concurrent.futures.ThreadPoolExecutor(max_workers=len(hosts)) as hosts_executor:
+            return dict(zip(
+                [host.name for host in hosts],
+                hosts_executor.map(homepose.libs.timing.TIMER.bind(operation), hosts)
+            ))
 
     def remove_current_containers(self) -> None:
-        all_current_containers = self.__instance.containers.list(all=True)
-        for container in all_current_containers:
-            container.remove(force=True)
+        try:
+            self.run_on_hosts(lambda host: self.get_host_compose(host).compose_down_projects())
+        except docker.errors.APIError as encountered_exception:
+            raise shutil.ExecError('Decomposition halted!') from encountered_exception
 
     def restart_docker_network(self, network_name: str) -> None:
-        with contextlib.suppress(docker.errors.NotFound):
-            network = self.__instance.networks.get(network_name)
-            network.remove()
-        self.__instance.networks.create(network_name)
+        def restart_host_network(host: homepose.libs.placement.HomeposeDockerHost) -> None:
+            with contextlib.suppress(docker.errors.NotFound):
+                network = self.get_host_client(host).networks.get(network_name)
+                network.remove()
+            self.get_host_client(host).networks.create(network_name)
+
+        self.run_on_hosts(restart_host_network)
+
+    def prune_images(self, active_services: list) -> list:
+        services_by_host = self.placement.group_by_host(active_services)
+        return [
+            image_name
+            for removed_images in self.run_on_hosts(
+                lambda host: homepose.libs.images.HomeposeImageCache(self.get_host_client(host)).prune_stale_images(services_by_host[host.name])
+            ).values()
+            for image_name in removed_images
+        ]
+
+    def ensure_docker_network(self, network_name: str) -> None:
+        def ensure_host_network(host: homepose.libs.placement.HomeposeDockerHost) -> None:
+            if not any(network.name == network_name for network in self.get_host_client(host).networks.list(names=[network_name])):
+                self.get_host_client(host).networks.create(network_name)
+
+        self.run_on_hosts(ensure_host_network)
+
+    def render_templates(self) -> None:
+        with homepose.libs.timing.TIMER.span('fill_templates'):
+            homepose.libs.utils.fill_templates(
+                self.enviroment["TEMPLATES_FOLDER"],
+                self.enviroment["GENERATED_FOLDER"]
+            )
 
     def compose_services(self, services_list: list, logger: homepose.libs.utils.HomeposeLogger) -> None:
-        self.__logger = logger
-        homepose.libs.utils.fill_templates(
-            self.enviroment["TEMPLATES_FOLDER"],
-            self.enviroment["GENERATED_FOLDER"]
+        self.render_templates()
+        with homepose.libs.timing.TIMER.span('remove_containers'):
+            self.remove_current_containers()
+        self.ensure_docker_network(self.enviroment["HOMEPOSE_DOCKER_NETWORK"])
+        self.run_deployments(services_list, logger)
+
+    def reconcile_services(self, services_list: list, logger: homepose.libs.utils.HomeposeLogger) -> None:
+        self.render_templates()
+        self.ensure_docker_network(self.enviroment["HOMEPOSE_DOCKER_NETWORK"])
+        with self.update_deployment_state() as deployment_state:
+            for service_name in deployment_state.get_known_services():
+                if service_name not in services_list:
+                    logger.info(f' Service {service_name} is no longer enabled. Decomposing it...')
+                    self.compose_down(service_name)
+                    deployment_state.forget(service_name)
+            changed_services = [
+                service_name
+                for service_name in services_list
+                if deployment_state[service_name] != self.fingerprint_service(service_name) or not self.is_service_running(service_name)
+            ]
+        if not changed_services:
+            logger.info(' All services are up to date!')
+            return
+        logger.info(f' Services to be redeployed: {", ".join(changed_services)}')
+        self.compose_down_services([service_name for service_name in changed_services if deployment_state[service_name]])
+        self.run_deployments(changed_services, logger)
+
+    def deploy_services(self, services_list: list, logger: homepose.libs.utils.HomeposeLogger) -> None:
+        self.render_templates()
+        self.ensure_docker_network(self.enviroment["HOMEPOSE_DOCKER_NETWORK"])
+        self.compose_down_services(services_list)
+        self.run_deployments(services_list, logger)
+
+    def rolling_restart(self, services_list: list, logger: homepose.libs.utils.HomeposeLogger) -> None:
+        self.render_templates()
+        self.ensure_docker_network(self.enviroment["HOMEPOSE_DOCKER_NETWORK"])
+        services_graph = homepose.libs.scheduling.HomeposeServiceGraph.from_config(services_list, self.enviroment.config)
+        for service_name in reversed(services_graph.ordered()):
+            logger.info(f' Restarting service: {service_name}...')
+            with homepose.libs.timing.TIMER.span('restart_service', service_name):
+                self.compose_down(service_name)
+                self.run_deployments([service_name], logger)
+
+    def decompose_services(self, services_list: list) -> None:
+        self.compose_down_services(services_list)
+        with self.update_deployment_state() as deployment_state:
+            for service_name in services_list:
+                deployment_state.forget(service_name)
+
+    def compose_down_services(self, services_list: list) -> None:
+        if not services_list:
+            return
+        try:
+            self.run_on_hosts(lambda host: self.get_host_compose(host).compose_down_projects(list(services_list)))
+        except docker.errors.APIError as encountered_exception:
+            raise shutil.ExecError('Decomposition halted!') from encountered_exception
+
+    def get_services_status(self, services_list: list) -> dict:
+        deployment_state = self.load_deployment_state()
+        services_graph = homepose.libs.scheduling.HomeposeServiceGraph.from_config(services_list, self.enviroment.config)
+        return {
+            service_name: {
+                'running': self.is_service_running(service_name),
+                'deployed': bool(deployment_state[service_name]),
+                'up_to_date': deployment_state[service_name] == self.fingerprint_service(service_name),
+                'depends_on': sorted(services_graph.dependencies[service_name]),
+                'host': self.placement.get_host(service_name).name
+            }
+            for service_name in services_list
+        }
+
+    def run_deployments(self, services_list: list, logger: homepose.libs.utils.HomeposeLogger) -> None:
+        self.validate_readiness_probes(services_list)
+        services_graph = homepose.libs.scheduling.HomeposeServiceGraph.from_config(services_list, self.enviroment.config)
+        workers_count = int(self.enviroment['DEPLOYMENT_WORKERS'] or homepose.libs.vars.DEFAULT_DEPLOYMENT_WORKERS)
+        scheduler = homepose.libs.scheduling.HomeposeScheduler(services_graph, workers_count)
+        self.log_placement(services_list, logger)
+        services_loggers = {
+            service_name: self.open_service_logger(service_name, logger)
+            for service_name in services_list
+        }
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max(workers_count, 1)) as preparation_executor:
+            preparations = {
+                service_name: preparation_executor.submit(
+                    homepose.libs.timing.TIMER.bind(self.prepare_service),
+                    service_name,
+                    services_loggers[service_name]
+                )
+                for service_name in services_graph.ordered()
+            }
+            try:
+                scheduler.run(homepose.libs.timing.TIMER.bind(
+                    lambda service_name: self.deploy_service(service_name, preparations[service_name], services_loggers[service_name])
+                ))
+            finally:
+                for preparation in preparations.values():
+                    preparation.cancel()
+                for service_logger in services_loggers.values():
+                    service_logger.close()
+        self.record_deployments(scheduler, logger)
+
+    def log_placement(self, services_list: list, logger: homepose.libs.utils.HomeposeLogger) -> None:
+        if len(self.placement.hosts) > 1:
+            for host_name, host_services in self.placement.group_by_host(services_list).items():
+                logger.info(f' Services placed on {host_name}: {", ".join(host_services) or "-"}')
+            for host_name in self.placement.get_overloaded_hosts():
+                logger.warning(f' Docker host {host_name} is loaded above its capacity of {self.placement.hosts[host_name].capacity}')
+            for service_name, dependencies in self.placement.unreachable_dependencies.items():
+                if service_name in services_list:
+                    logger.warning(
+                        f' Service {service_name} is placed apart from {", ".join(dependencies)}, which publish no ports. '
+                        f'If it connects to them, publish their ports and use [<SERVICE>_ADDRESS] or place them on {self.placement.get_host(service_name).name}'
+                    )
+        if remote_hosts := sorted({self.placement.get_host(service_name).name for service_name in services_list if self.placement.get_host(service_name).is_remote()}):
+            logger.warning(
+                f' Mount points, custom scripts and pre_init/post_init scripts are prepared on this machine only, '
+                f'bind-mounted paths have to exist on {", ".join(remote_hosts)} as well'
+            )
+
+    def record_deployments(self, scheduler: homepose.libs.scheduling.HomeposeScheduler, logger: homepose.libs.utils.HomeposeLogger) -> None:
+        with self.update_deployment_state() as deployment_state:
+            for service_name, result in scheduler.results.items():
+                if result == homepose.libs.vars.SERVICE_STATUS_DONE:
+                    deployment_state[service_name] = self.fingerprint_service(service_name)
+                else:
+                    deployment_state.forget(service_name)
+        ready_services = [service_name for service_name, result in scheduler.results.items() if result == homepose.libs.vars.SERVICE_STATUS_DONE]
+        for service_name in sorted(ready_services, key=lambda service_name: self.readiness_report[service_name], reverse=True):
+            logger.info(f' Time to ready of {service_name}: {self.readiness_report[service_name]:.1f}s')
+        for service_name, encountered_exception in scheduler.get_failures().items():
+            logger.error(f' Deployment of {service_name} failed: {encountered_exception.__cause__ or encountered_exception}')
+        if cancelled_services := scheduler.get_cancelled():
+            logger.error(f' Cancelled dependent services: {", ".join(cancelled_services)}')
+        if failed_services := scheduler.get_failures():
+            raise shutil.ExecError(f'Deployment of {", ".join(failed_services)} failed!') from next(iter(failed_services.values()))
+
+    def get_running_services(self) -> set:
+        return {
+            container['Labels'][homepose.libs.vars.HOMEPOSE_SERVICE_LABEL]
+            for host_containers in self.run_on_hosts(
+                lambda host: self.get_host_client(host).api.containers(filters={'label': homepose.libs.vars.HOMEPOSE_SERVICE_LABEL, 'status': 'running'})
+            ).values()
+            for container in host_containers
+        }
+
+    def reload_service(self, service_name: str) -> int:
+        reload_command = self.enviroment[f'{service_name.upper()}_RELOAD_COMMAND'] or homepose.libs.vars.DEFAULT_PROXY_RELOAD_COMMAND
+        reloaded_containers = 0
+        client = self.get_client(service_name)
+        for container in client.api.containers(filters={'label': f'{homepose.libs.vars.HOMEPOSE_SERVICE_LABEL}={service_name}', 'status': 'running'}):
+            with contextlib.suppress(docker.errors.NotFound, docker.errors.APIError):
+                reload_execution = client.api.exec_create(container['Id'], reload_command)
+                client.api.exec_start(reload_execution['Id'])
+                if not client.api.exec_inspect(reload_execution['Id']).get('ExitCode'):
+                    reloaded_containers += 1
+        return reloaded_containers
+
+    def is_service_running(self, service_name: str) -> bool:
+        return bool(self.get_client(service_name).containers.list(filters={'label': f'{homepose.libs.vars.COMPOSE_PROJECT_LABEL}={service_name}'}))
+
+    def load_deployment_state(self) -> homepose.libs.state.HomeposeDeploymentState:
+        return homepose.libs.state.HomeposeDeploymentState(
+            f'{self.enviroment["GENERATED_FOLDER"]}/{homepose.libs.vars.DEPLOYMENT_STATE_FILENAME}'
+        )
+
+    @contextlib.contextmanager
+    def update_deployment_state(self) -> typing.Iterator[homepose.libs.state.HomeposeDeploymentState]:
+        with self.__state_lock:
+            deployment_state = self.load_deployment_state()
+            yield deployment_state
+            deployment_state.save()
+
+    def fingerprint_service(self, service_name: str) -> str:
+        service_compose_path = self.get_service_compose_path(service_name)
+        dockerfile_template_path = f'{self.enviroment["TEMPLATES_FOLDER"]}/dockerfiles/{service_name}'
+        service_fingerprint = homepose.libs.state.fingerprint_files(
+            [
+                f'{service_compose_path}/docker-compose.yml',
+                dockerfile_template_path if os.path.exists(dockerfile_template_path) else f'{service_compose_path}/Dockerfile',
+                f'{service_compose_path}/.env',
+                f'{service_compose_path}/pre_init.sh',
+                f'{service_compose_path}/post_init.sh'
+            ],
+            self.get_service_variables(service_name)
+        )
+        if len(self.placement.hosts) > 1:
+            return f'{self.placement.get_host(service_name).name}:{service_fingerprint}'
+        return service_fingerprint
+
+    def get_service_variables(self, service_name: str) -> dict:
+        dot_env_file_path = f'{self.get_service_compose_path(service_name)}/.env'
+        dot_env_values = dotenv.dotenv_values(dot_env_file_path) if os.path.exists(dot_env_file_path) else {}
+        return {
+            **{variable_name: value for variable_name, value in dot_env_values.items() if value is not None},
+            **os.environ
+        }
+
+    def open_service_logger(self, service_name: str, logger: homepose.libs.utils.HomeposeLogger) -> homepose.libs.utils.HomeposeServiceLogger:
+        service_compose_path = self.get_service_compose_path(service_name)
+        return logger.for_service(
+            service_name,
+            f'{service_compose_path}/{homepose.libs.vars.DEPLOYMENT_LOG_FILENAME}' if os.path.isdir(service_compose_path) else ''
+        )
+
+    def prepare_service(self, service_name: str, logger: homepose.libs.utils.HomeposeServiceLogger) -> None:
+        logger.info(f' Preparing service: {service_name}... ')
+        with homepose.libs.timing.TIMER.span('pre_init', service_name):
+            self.run_bash_script(f'{self.get_service_compose_path(service_name)}/pre_init.sh', logger, self.get_service_variables(service_name))
+        try:
+            with homepose.libs.timing.TIMER.span('image_build', service_name):
+                self.build_docker_image(service_name, logger)
+        except Exception as encountered_exception:
+            logger.error(f' Preparation of {service_name} failed: {encountered_exception}')
+            raise shutil.ExecError(f'Preparation of {service_name} failed!') from encountered_exception
+
+    def deploy_service(self, service_name: str, preparation: concurrent.futures.Future, logger: homepose.libs.utils.HomeposeServiceLogger) -> None:
+        preparation.result()
+        logger.info(f' Enabling service: {service_name}... ')
+        try:
+            with homepose.libs.timing.TIMER.span('compose_up', service_name):
+                self.compose_service(service_name, logger)
+        except Exception as encountered_exception:
+            logger.error(f' Deployment of {service_name} failed: {encountered_exception}')
+            raise shutil.ExecError(f'Deployment of {service_name} failed!') from encountered_exception
+        with homepose.libs.timing.TIMER.span('post_init', service_name):
+            self.run_bash_script(f'{self.get_service_compose_path(service_name)}/post_init.sh', logger, self.get_service_variables(service_name))
+        logger.info(f' Waiting for {service_name} to become ready...')
+        with homepose.libs.timing.TIMER.span('readiness', service_name):
+            self.readiness_report[service_name] = self.wait_until_ready(service_name)
+        logger.info(f' Service {service_name} enabled and ready after {self.readiness_report[service_name]:.1f}s!')
+
+    def wait_until_ready(self, service_name: str) -> float:
+        return self.get_readiness_probe(service_name).wait()
+
+    def get_readiness_probe(self, service_name: str) -> HomeposeReadinessProbe:
+        service_prefix = service_name.upper()
+        try:
+            timeout = float(self.enviroment[f'{service_prefix}_READY_TIMEOUT'] or homepose.libs.vars.DEFAULT_READINESS_TIMEOUT)
+        except ValueError as encountered_exception:
+            raise shutil.ExecError(f'{service_prefix}_READY_TIMEOUT has to be a number of seconds!') from encountered_exception
+        return HomeposeReadinessProbe(
+            service_name,
+            self.get_client(service_name),
+            tcp_address=self.get_probe_address(service_name, self.enviroment[f'{service_prefix}_READY_TCP'] or ''),
+            http_url=self.get_probe_address(service_name, self.enviroment[f'{service_prefix}_READY_HTTP'] or ''),
+            timeout=timeout
         )
-        self.remove_current_containers()
-        network_name = self.enviroment["HOMEPOSE_DOCKER_NETWORK"]
-        network = self.__instance.networks.get(network_name)
-        network.remove()
+
+    def get_probe_address(self, service_name: str, probe_address: str) -> str:
+        host = self.placement.get_host(service_name)
+        if not probe_address or not host.address or not host.is_remote():
+            return probe_address
+        if '://' not in probe_address:
+            probe_host, _, probe_port = probe_address.rpartition(':')
+            return f'{host.address}:{probe_port}' if probe_host in homepose.libs.vars.LOCAL_ADDRESSES else probe_address
+        parsed_url = urllib.parse.urlsplit(probe_address)
+        try:
+            url_port = parsed_url.port
+        except ValueError:
+            return probe_address
+        if (parsed_url.hostname or '') not in homepose.libs.vars.LOCAL_ADDRESSES:
+            return probe_address
+        return parsed_url._replace(netloc=f'{host.address}:{url_port}' if url_port else host.address).geturl()
+
+    def validate_readiness_probes(self, services_list: list) -> None:
         for service_name in services_list:
-            logger.info(f' Enabling service: {service_name}... ')
-            self.__current_service_name = service_name
-            self.__service_compose_path = f'{self.enviroment["COMPOSE_FILES_FOLDER"]}/{service_name}'
-            self.run_bash_script(f'{self.__service_compose_path}/pre_init.sh')
-            try:
-                self.compose_up()
-            except Exception as encountered_exception:
-                raise shutil.ExecError(f'Deployment of {service_name} failed!') from encountered_exception
-            self.run_bash_script(f'{self.__service_compose_path}/post_init.sh')
+            self.get_readiness_probe(service_name).validate()
 
-    def run_bash_script(self, script_path: str) -> None:
+    def get_service_compose_path(self, service_name: str) -> str:
+        return f'{self.enviroment["COMPOSE_FILES_FOLDER"]}/{service_name}'
+
+    def run_bash_script(
+        self,
+        script_path: str,
+        logger: typing.Optional[homepose.libs.utils.HomeposeServiceLogger] = None,
+        variables: typing.Optional[dict] = None
+    ) -> None:
         if os.path.exists(script_path):
-            self.run_with_popen(f'bash {script_path}', f'{script_path}.log')
+            script_runner = self.run_with_popen(f'bash {script_path}', f'{script_path}.log', logger, variables)
+            if script_runner.returncode and logger:
+                logger.warning(f'  {os.path.basename(script_path)} exited with code {script_runner.returncode}:\n{script_runner.get_tail()}')
 
-    @staticmethod
-    def run_with_popen(command: str, logpath: str) -> int:
-        with subprocess.Popen(command, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE) as process:
-            process_output = [
-                line.decode()
-                for line in process.communicate()
-                if line.decode()
-            ]
-            if process.poll():
-                return 1
-            if process_output:
-                with open(logpath, 'w', encoding='utf-8') as script_log:
-                    script_log.writelines(process_output)
-        return 0
-
-    def compose_up(self, ignore_dockerfile: bool = False) -> None:
-        self.source_additional_env_vars()
-        if not ignore_dockerfile:
-            self.build_docker_image()
-        self.compose_currently_selected_service()
-
-    def build_docker_image(self) -> None:
-        dockerfile_template_path = f'{self.enviroment["TEMPLATES_FOLDER"]}/dockerfiles/{self.__current_service_name}'
+    def run_with_popen(
+        self,
+        command: str,
+        logpath: str,
+        logger: typing.Optional[homepose.libs.utils.HomeposeServiceLogger] = None,
+        variables: typing.Optional[dict] = None
+    ) -> homepose.libs.processes.HomeposeStreamingRunner:
+        command_runner = homepose.libs.processes.HomeposeStreamingRunner(
+            homepose.libs.processes.HomeposeOutputSink(logpath, logger, self.output_log_level, self.output_tail_size)
+        )
+        try:
+            command_runner.run(command, variables)
+        finally:
+            homepose.libs.timing.TIMER.record_output(command_runner.sink.output_bytes, command_runner.returncode)
+        return command_runner
+
+    def build_docker_image(self, service_name: str, logger: homepose.libs.utils.HomeposeServiceLogger) -> None:
+        service_compose_path = self.get_service_compose_path(service_name)
+        dockerfile_template_path = f'{self.enviroment["TEMPLATES_FOLDER"]}/dockerfiles/{service_name}'
         if os.path.exists(dockerfile_template_path):
-            dockerfile_target_path = f'{self.__service_compose_path}/Dockerfile'
-            filled_dockerfile_template = homepose.libs.utils.generate_dockerfile(dockerfile_template_path)
-            with open(dockerfile_target_path, 'w', encoding='utf-8') as target_dockerfile:
-                target_dockerfile.truncate(0)
-                target_dockerfile.write(filled_dockerfile_template)
-        if os.path.exists(f'{self.enviroment["COMPOSE_FILES_FOLDER"]}/{self.__current_service_name}/Dockerfile'):
-            self.__logger.info(f'  Found custom Dockerfile for {self.__current_service_name}!')
-            self.__logger.info('  Building Docker image ...')
-            if self.run_with_popen(
-                f'docker build -t custom-{self.__current_service_name} {self.__service_compose_path}',
-                f'{self.enviroment["COMPOSE_FILES_FOLDER"]}/{self.__current_service_name}/docker_build.log'
-            ):
-                raise shutil.ExecError('Docker image build failed!')
-
-    def source_additional_env_vars(self) -> None:
-        dot_env_file_path = f'{self.__service_compose_path}/.env'
-        if os.path.exists(dot_env_file_path):
-            self.__logger.info(f'  Sourcing additional enviroment variables for {self.__current_service_name}!')
-            dotenv.load_dotenv(dot_env_file_path)
-
-    def compose_currently_selected_service(self) -> None:
-        if self.__logger:
-            self.__logger.info(f'  Composing Docker container for {self.__current_service_name}!')
-        docker_compose_file_path = f'{self.__service_compose_path}/docker-compose.yml'
-        self.compose_with_file(docker_compose_file_path)
+            dockerfile_target_path = f'{service_compose_path}/Dockerfile'
+            _, undefined_markers = homepose.libs.templating.TEMPLATE_ENGINE.render_to_file(
+                dockerfile_template_path,
+                dockerfile_target_path,
+                self.get_service_variables(service_name)
+            )
+            if undefined_markers:
+                logger.warning(f'  Undefined markers in Dockerfile template of {service_name}: {", ".join(sorted(undefined_markers))}')
+        if os.path.exists(f'{service_compose_path}/Dockerfile'):
+            logger.info(f'  Found custom Dockerfile for {service_name}!')
+            image_cache = self.get_image_cache(service_name)
+            image_tag = image_cache.get_image_tag(service_name)
+            build_key = image_cache.compute_build_key(service_compose_path)
+            if image_cache.is_up_to_date(image_tag, build_key):
+                logger.info(f'  Docker image {image_tag} is up to date, skipping build!')
+                return
+            try:
+                self.get_compose(service_name).build_image(
+                    service_compose_path,
+                    image_tag,
+                    f'{service_compose_path}/docker_build.log',
+                    logger,
+                    labels={homepose.libs.vars.BUILD_KEY_LABEL: build_key}
+                )
+            except docker.errors.APIError as encountered_exception:
+                raise shutil.ExecError('Docker image build failed!') from encountered_exception
 
-    @staticmethod
-    def compose_with_file(filepath: str) -> None:
-        compose_command = f'docker-compose -f {filepath} up -d'
-        with subprocess.Popen(compose_command, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE) as compose_process:
-            compose_process_output = [line.decode() for line in compose_process.communicate()]
-            if compose_process.poll():
-                raise shutil.ExecError(f'Deployment of service failed: {compose_process_output}')
-
-    def compose_down(self) -> None:
-        docker_compose_file_path = f'{self.__service_compose_path}/docker-compose.yml'
+    def compose_service(self, service_name: str, logger: homepose.libs.utils.HomeposeServiceLogger) -> None:
+        logger.info(f'  Composing Docker container for {service_name}!')
+        docker_compose_file_path = f'{self.get_service_compose_path(service_name)}/docker-compose.yml'
+        compose = self.get_compose(service_name)
         try:
-            _ = subprocess.run(
-                f'docker-compose -f {docker_compose_file_path} down',
-                shell=True,
-                check=True,
-                capture_output=True
-            )
-        except subprocess.CalledProcessError as encountered_exception:
-            raise shutil.ExecError('Decomposition halted!') from encountered_exception
+            compose.compose_up(compose.load_project(docker_compose_file_path, service_name), logger)
+        except docker.errors.APIError as encountered_exception:
+            raise shutil.ExecError(f'Deployment of service failed: {encountered_exception}') from encountered_exception
+
+    def compose_down(self, service_name: str) -> None:
+        self.compose_down_services([service_name])
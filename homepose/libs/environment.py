@@ -1,38 +1,114 @@
+import contextlib
 import dataclasses
+import functools
+import hashlib
+import json
 import os
 import shutil
 import subprocess
+import typing
 
 import configparser
 
+import homepose.libs.files
+import homepose.libs.placement
+import homepose.libs.secrets_store
 import homepose.libs.vars
+import homepose.libs.volumes
 
 
 @dataclasses.dataclass
-class HomeposeDeployEnvironment():
+class HomeposeDeployEnvironment():  # pylint: disable=R0904
     config_file_path: str = dataclasses.field(default=homepose.libs.vars.DEFAULT_CONFIG_FILE_PATH)
     www_data_username: str = dataclasses.field(default=homepose.libs.vars.DEFAULT_WWW_DATA_USER)
     www_data_userid: int = dataclasses.field(default=homepose.libs.vars.DEFAULT_WWW_DATA_USERID)
     www_data_groupid: int = dataclasses.field(default=homepose.libs.vars.DEFAULT_WWW_DATA_GROUPID)
 
-    config: dict = dataclasses.field(init=False, default_factory=dict)
     __instance: dict = dataclasses.field(init=False, default_factory=dict)
+    __configs: typing.ClassVar[dict] = {}
+    __placements: typing.ClassVar[dict] = {}
 
     def __new__(cls, *args, **kwargs) -> 'HomeposeDeployEnvironment':
-        if os.geteuid() != 0:
-            raise shutil.ExecError('This module has to be run within script run with superuser privileges.')
+        cls.check_privileges()
         if not hasattr(cls, '_HomeposeDeployEnvironment__instance'):
             cls.__instance = {}
         if cls not in cls.__instance:
-            new_instance = super(HomeposeDeployEnvironment, cls).__new__(cls, *args, **kwargs)
-            new_instance.config = cls.parse_config_file(cls.config_file_path)
-            new_instance.export_config()
-            cls.__instance[cls] = new_instance
+            cls.__instance[cls] = super(HomeposeDeployEnvironment, cls).__new__(cls, *args, **kwargs)
         return cls.__instance[cls]
 
+    @staticmethod
+    def check_privileges() -> None:
+        if os.geteuid() != 0:
+            raise shutil.ExecError('This module has to be run within script run with superuser privileges.')
+
+    @classmethod
+    def reset(cls) -> None:
+        cls.__configs.clear()
+        cls.__placements.clear()
+        if hasattr(cls, '_HomeposeDeployEnvironment__instance'):
+            cls.__instance.clear()
+
     def __getitem__(self, key: str):
         return self.config.get(key)
 
+    @property
+    def config(self) -> dict:
+        if self.config_file_path not in self.__configs:
+            self.__configs[self.config_file_path] = self.load_config(self.config_file_path)
+            self.export_config()
+        return self.__configs[self.config_file_path]
+
+    def reload_config(self) -> dict:
+        previous_config = self.__configs.pop(self.config_file_path, {})
+        self.__placements.pop(self.config_file_path, None)
+        for setting_name, setting in self.config.items():
+            if setting_name in previous_config and os.environ.get(setting_name) == previous_config[setting_name]:
+                os.environ[setting_name] = setting
+        return self.config
+
+    @classmethod
+    def load_config(cls, config_file_path: str) -> dict:
+        snapshot_path = f'{config_file_path}{homepose.libs.vars.CONFIG_SNAPSHOT_SUFFIX}'
+        if not os.path.exists(config_file_path):
+            raise shutil.ReadError(f'Configuration file {config_file_path} does not exist!')
+        config_file_stats = os.stat(config_file_path)
+        snapshot = cls.read_config_snapshot(snapshot_path)
+        if snapshot.get('mtime_ns') == config_file_stats.st_mtime_ns and snapshot.get('size') == config_file_stats.st_size:
+            return snapshot['config']
+        with open(config_file_path, 'rb') as config_file:
+            config_file_hash = hashlib.sha256(config_file.read()).hexdigest()
+        if snapshot.get('sha256') != config_file_hash:
+            snapshot['config'] = cls.parse_config_file(config_file_path)
+            cls.validate_config(snapshot['config'])
+        snapshot.update(mtime_ns=config_file_stats.st_mtime_ns, size=config_file_stats.st_size, sha256=config_file_hash)
+        with contextlib.suppress(OSError):
+            cls.write_config_snapshot(snapshot_path, snapshot)
+        return snapshot['config']
+
+    @staticmethod
+    def read_config_snapshot(snapshot_path: str) -> dict:
+        with contextlib.suppress(OSError, ValueError):
+            with open(snapshot_path, 'r', encoding='utf-8') as snapshot_file:
+                snapshot = json.load(snapshot_file)
+            if snapshot.get('version') == homepose.libs.vars.CONFIG_SNAPSHOT_VERSION and isinstance(snapshot.get('config'), dict):
+                return snapshot
+        return {'version': homepose.libs.vars.CONFIG_SNAPSHOT_VERSION}
+
+    @staticmethod
+    def write_config_snapshot(snapshot_path: str, snapshot: dict) -> None:
+        homepose.libs.files.write_atomically(snapshot_path, json.dumps(snapshot).encode('utf-8'), 0o600)
+
+    @staticmethod
+    def validate_config(config: dict) -> None:
+        if not config:
+            raise shutil.ReadError('Configuration is empty! Check your .ini file.')
+        if missing_settings := [
+            setting_name
+            for setting_name in homepose.libs.vars.REQUIRED_CONFIG_SETTINGS
+            if not config.get(setting_name)
+        ]:
+            raise shutil.ReadError(f'Configuration is missing required settings: {", ".join(missing_settings)}')
+
     @staticmethod
     def parse_config_file(config_file_path: str) -> dict:
         config_file_contents = configparser.ConfigParser(
@@ -70,36 +146,60 @@ class HomeposeDeployEnvironment():
             os.environ['WWW_DATA_UID'] = str(self.www_data_userid)
             os.environ['WWW_DATA_GID'] = str(self.www_data_groupid)
 
-    @staticmethod
-    def export_secret(secret_name: str) -> None:
-        secret = os.popen('openssl rand -hex 16').read().rstrip()
-        os.environ[f'{secret_name.upper()}_SECRET'] = secret
+    @functools.cached_property
+    def secrets_store(self) -> homepose.libs.secrets_store.HomeposeSecretsStore:
+        return homepose.libs.secrets_store.HomeposeSecretsStore(
+            f'{self.config["GENERATED_FOLDER"]}/{homepose.libs.vars.SECRETS_STORE_FILENAME}'
+        )
+
+    def export_secrets(self, services_list: list) -> None:
+        for service_name, secret in self.secrets_store.ensure_secrets(
+            services_list,
+            {
+                service_name: f'{self.config["COMPOSE_FILES_FOLDER"]}/{service_name}/.env'
+                for service_name in services_list
+            }
+        ).items():
+            os.environ[f'{service_name.upper()}_SECRET'] = secret
+
+    def rotate_secret(self, service_name: str) -> None:
+        os.environ[f'{service_name.upper()}_SECRET'] = self.secrets_store.rotate_secret(service_name)
+
+    @functools.cached_property
+    def volumes(self) -> homepose.libs.volumes.HomeposeVolumeManager:
+        return homepose.libs.volumes.HomeposeVolumeManager.from_config(
+            self.config,
+            int(self.config.get('VOLUME_WORKERS') or homepose.libs.vars.DEFAULT_VOLUME_WORKERS)
+        )
 
     def mount_directories(self) -> None:
-        for mount in (
-            self.config[path_name]
-            for path_name in list(self.config.keys())
-            if '_MOUNT_POINT' in path_name
-        ):
-            os.makedirs(mount, exist_ok=True)
-        os.makedirs(self.config['GENERATED_FOLDER'], exist_ok=True)
-        os.makedirs(f'{self.config["GENERATED_FOLDER"]}/configs', exist_ok=True)
-        os.makedirs(f'{self.config["GENERATED_FOLDER"]}/dockerfiles', exist_ok=True)
-
-    def unmount_directories(self, force: bool = False) -> None:
-        persistent_volumes = [] if force else os.environ['PERSISTENT_VOLUMES']
-        for mount in (
-            self.config[path_name]
-            for path_name in list(self.config.keys())
-            if '_MOUNT_POINT' in path_name
-        ):
-            if mount not in persistent_volumes and os.path.exists(mount):
-                uid = os.environ.get('SUDO_UID') or '1000'
-                gid = os.environ.get('SUDO_GID') or '1000'
-                os.chown(mount, int(uid), int(gid))
-                shutil.rmtree(mount, ignore_errors=True)
+        generated_directories = [
+            self.config['GENERATED_FOLDER'],
+            f'{self.config["GENERATED_FOLDER"]}/configs',
+            f'{self.config["GENERATED_FOLDER"]}/dockerfiles'
+        ]
+        self.volumes.create_directories(generated_directories)
+        if os.environ.get('SUDO_UID') and os.environ.get('SUDO_GID'):
+            self.volumes.fix_ownership(generated_directories, int(os.environ['SUDO_UID']), int(os.environ['SUDO_GID']))
+
+    def unmount_directories(self, force: bool = False, dry_run: bool = False) -> list:
+        volumes_report = self.volumes.get_report(force) if dry_run else []
+        if not dry_run:
+            self.volumes.purge_trash()
+            removed_mount_points = self.volumes.remove_directories(force)
+            volumes_report = [{'path': mount_point, 'size': None, 'removed': True} for mount_point in removed_mount_points]
+        return volumes_report
 
     def get_enabled_services(self) -> list:
         if enabled_services := self.config.get('ENABLED_SERVICES'):
             return enabled_services.split(',')
         return []
+
+    def get_all_services(self) -> list:
+        return [self.config.get('DATABASE_BACKEND'), *self.get_enabled_services(), self.config.get('REVERSE_PROXY_NAME')]
+
+    @property
+    def placement(self) -> homepose.libs.placement.HomeposePlacement:
+        if self.config_file_path not in self.__placements:
+            self.__placements[self.config_file_path] = homepose.libs.placement.HomeposePlacement.from_config(self.get_all_services(), self.config)
+        return self.__placements[self.config_file_path]
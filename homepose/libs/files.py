@@ -0,0 +1,22 @@
+import os
+import tempfile
+import typing
+
+
+def write_atomically(file_path: str, contents: bytes, mode: typing.Optional[int] = None, sync: bool = False) -> None:
+    file_folder = os.path.dirname(os.path.abspath(file_path))
+    os.makedirs(file_folder, exist_ok=True)
+    if mode is None:
+        mode = os.stat(file_path).st_mode & 0o7777 if os.path.exists(file_path) else 0o644
+    file_descriptor, temporary_file_path = tempfile.mkstemp(dir=file_folder, prefix=f'.{os.path.basename(file_path)}.', suffix='.tmp')
+    try:
+        with os.fdopen(file_descriptor, 'wb') as temporary_file:
+            temporary_file.write(contents)
+            if sync:
+                temporary_file.flush()
+                os.fsync(temporary_file.fileno())
+        os.chmod(temporary_file_path, mode)
+        os.replace(temporary_file_path, file_path)
+    finally:
+        if os.path.exists(temporary_file_path):
+            os.remove(temporary_file_path)
@@ -0,0 +1,100 @@
+import dataclasses
+import os
+import typing
+
+import homepose.libs.files
+import homepose.libs.vars
+
+
+@dataclasses.dataclass
+class HomeposeHostsFile():
+    hosts_file_path: str = dataclasses.field(default=homepose.libs.vars.HOSTS_TARGET_FILE_PATH)
+
+    unmanaged_lines: list = dataclasses.field(init=False, default_factory=list)
+    managed_entries: dict = dataclasses.field(init=False, default_factory=dict)
+    index: dict = dataclasses.field(init=False, default_factory=dict)
+
+    __file_stamp: typing.Optional[tuple] = dataclasses.field(init=False, default=None)
+
+    def __post_init__(self) -> None:
+        self.read()
+
+    def read(self) -> None:
+        file_stamp = self.get_file_stamp()
+        if file_stamp is not None and file_stamp == self.__file_stamp:
+            return
+        self.__file_stamp = file_stamp
+        self.unmanaged_lines, self.managed_entries, self.index = [], {}, {}
+        if file_stamp is None:
+            return
+        is_inside_block = False
+        with open(self.hosts_file_path, 'r', encoding='utf-8') as hosts_file:
+            for line in hosts_file.read().splitlines():
+                if line.strip() == homepose.libs.vars.HOSTS_BLOCK_BEGIN_MARKER:
+                    is_inside_block = True
+                elif line.strip() == homepose.libs.vars.HOSTS_BLOCK_END_MARKER:
+                    is_inside_block = False
+                elif is_inside_block:
+                    for hostname, address in self.parse_line(line).items():
+                        self.managed_entries[hostname] = address
+                else:
+                    self.unmanaged_lines.append(line)
+                    for hostname, address in self.parse_line(line).items():
+                        self.index.setdefault(hostname, address)
+        self.index.update(self.managed_entries)
+
+    def get_file_stamp(self) -> typing.Optional[tuple]:
+        try:
+            hosts_file_stats = os.stat(self.hosts_file_path)
+        except FileNotFoundError:
+            return None
+        return hosts_file_stats.st_mtime_ns, hosts_file_stats.st_size, hosts_file_stats.st_ino
+
+    @staticmethod
+    def parse_line(line: str) -> dict:
+        fields = line.split('#', 1)[0].split()
+        if len(fields) < 2:
+            return {}
+        return {hostname: fields[0] for hostname in fields[1:]}
+
+    def get_diff(self, entries: dict) -> tuple:
+        added = {hostname: address for hostname, address in entries.items() if hostname not in self.managed_entries}
+        removed = {hostname: address for hostname, address in self.managed_entries.items() if hostname not in entries}
+        updated = {
+            hostname: address
+            for hostname, address in entries.items()
+            if hostname in self.managed_entries and self.managed_entries[hostname] != address
+        }
+        return added, removed, updated
+
+    def get_legacy_lines(self, entries: dict) -> list:
+        legacy_lines = []
+        for line in self.unmanaged_lines:
+            parsed_line = self.parse_line(line)
+            if len(parsed_line) == 1 and parsed_line.items() <= entries.items():
+                legacy_lines.append(line)
+        return legacy_lines
+
+    def apply(self, entries: dict) -> bool:
+        self.read()
+        legacy_lines = self.get_legacy_lines(entries)
+        if not any(self.get_diff(entries)) and not legacy_lines:
+            return False
+        self.unmanaged_lines = [line for line in self.unmanaged_lines if line not in legacy_lines]
+        self.managed_entries = dict(sorted(entries.items()))
+        self.write()
+        self.read()
+        return True
+
+    def render(self) -> str:
+        hosts_lines = list(self.unmanaged_lines)
+        while hosts_lines and not hosts_lines[-1].strip():
+            hosts_lines.pop()
+        if self.managed_entries:
+            hosts_lines.append(homepose.libs.vars.HOSTS_BLOCK_BEGIN_MARKER)
+            hosts_lines.extend(f'{address} {hostname}' for hostname, address in self.managed_entries.items())
+            hosts_lines.append(homepose.libs.vars.HOSTS_BLOCK_END_MARKER)
+        return '\n'.join(hosts_lines) + '\n'
+
+    def write(self) -> None:
+        homepose.libs.files.write_atomically(self.hosts_file_path, self.render().encode('utf-8'), sync=True)
@@ -0,0 +1,75 @@
+import contextlib
+import dataclasses
+import fnmatch
+import hashlib
+import os
+
+import docker  # type: ignore
+
+import homepose.libs.vars
+
+
+@dataclasses.dataclass
+class HomeposeImageCache():
+    client: docker.client.DockerClient
+
+    @staticmethod
+    def get_image_tag(service_name: str) -> str:
+        return f'{homepose.libs.vars.CUSTOM_IMAGE_PREFIX}{service_name}'
+
+    @staticmethod
+    def get_ignored_patterns(context_path: str) -> list:
+        ignored_patterns = list(homepose.libs.vars.BUILD_CACHE_IGNORED_PATTERNS)
+        dockerignore_path = f'{context_path}/.dockerignore'
+        if os.path.exists(dockerignore_path):
+            with open(dockerignore_path, 'r', encoding='utf-8') as dockerignore:
+                ignored_patterns.extend(
+                    line.strip().rstrip('/')
+                    for line in dockerignore
+                    if line.strip() and not line.startswith('#')
+                )
+        return ignored_patterns
+
+    @classmethod
+    def compute_build_key(cls, context_path: str) -> str:
+        ignored_patterns = cls.get_ignored_patterns(context_path)
+        build_key = hashlib.sha256()
+        for directory_path, directories_names, files_names in os.walk(context_path):
+            directories_names.sort()
+            for filename in sorted(files_names):
+                file_path = os.path.join(directory_path, filename)
+                relative_path = os.path.relpath(file_path, context_path)
+                if any(
+                    fnmatch.fnmatch(relative_path, pattern) or fnmatch.fnmatch(filename, pattern)
+                    for pattern in ignored_patterns
+                ):
+                    continue
+                build_key.update(relative_path.encode())
+                build_key.update(str(os.stat(file_path).st_mode & 0o777).encode())
+                with open(file_path, 'rb') as context_file:
+                    for chunk in iter(lambda: context_file.read(homepose.libs.vars.HASHING_CHUNK_SIZE), b''):  # pylint: disable=W0640
+                        build_key.update(chunk)
+        return build_key.hexdigest()
+
+    def is_up_to_date(self, image_tag: str, build_key: str) -> bool:
+        try:
+            image = self.client.images.get(image_tag)
+        except docker.errors.ImageNotFound:
+            return False
+        return (image.labels or {}).get(homepose.libs.vars.BUILD_KEY_LABEL) == build_key
+
+    def prune_stale_images(self, active_services: list) -> list:
+        active_tags = {
+            f'{self.get_image_tag(service_name)}:latest'
+            for service_name in active_services
+        }
+        removed_images = []
+        for image in self.client.images.list(filters={'label': homepose.libs.vars.BUILD_KEY_LABEL}):
+            if any(image_tag in active_tags for image_tag in image.tags):
+                continue
+            if image.tags and not all(image_tag.startswith(homepose.libs.vars.CUSTOM_IMAGE_PREFIX) for image_tag in image.tags):
+                continue
+            with contextlib.suppress(docker.errors.APIError):
+                self.client.images.remove(image.id)
+                removed_images.append(image.tags[0] if image.tags else image.short_id)
+        return removed_images
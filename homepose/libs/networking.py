@@ -1,54 +1,154 @@
+import contextlib
 import dataclasses
+import functools
+import json
 import os
-import shutil
+import threading
+import typing
 
 import homepose.libs.environment
+import homepose.libs.files
+import homepose.libs.hosts
+import homepose.libs.provisioning
+import homepose.libs.templating
 import homepose.libs.utils
 
 
 @dataclasses.dataclass
 class HomeposeNetworking():
     enviroment: homepose.libs.environment.HomeposeDeployEnvironment = dataclasses.field(init=False, default_factory=homepose.libs.environment.HomeposeDeployEnvironment)
-    host_ip_address: str = dataclasses.field(init=False, default='')
 
-    __additional_gateways: dict = dataclasses.field(init=False, default_factory=dict)
-    __hosts_file_contents: str = dataclasses.field(init=False, default='')
+    command_runner: homepose.libs.provisioning.HomeposeCommandRunner = dataclasses.field(default_factory=homepose.libs.provisioning.HomeposeCommandRunner)
 
-    def __post_init__(self):  # sourcery skip: remove-redundant-if
+    __additional_gateways: typing.Optional[dict] = dataclasses.field(init=False, default=None)
+    __hosts_lock: threading.Lock = dataclasses.field(init=False, default_factory=threading.Lock)
+    __gateways_lock: threading.Lock = dataclasses.field(init=False, default_factory=threading.Lock)
+    __exported_addresses: dict = dataclasses.field(init=False, default_factory=dict)
+
+    @functools.cached_property
+    def host_ip_address(self) -> str:
         for line in os.popen('ip a show ${HOMEPOSE_ETHERNET_INTERFACE}').readlines():
             if 'inet ' and 'scope global dynamic' in line:  # pylint: disable=R1726
-                self.host_ip_address = line.strip()[5:line.find('/')-4]
-                os.environ.setdefault('HOMEPOSE_IP_ADDRESS', self.host_ip_address)
-                os.environ.setdefault('HOSTNAME', os.popen('hostname').read().rstrip())
-                break
-        with open(homepose.libs.vars.HOSTS_TARGET_FILE_PATH, 'r', encoding='utf8') as current_hosts_file:
-            self.__hosts_file_contents = current_hosts_file.read()
-
-    def configure_dns(self):
-        dnsmasq_install_result = os.popen('yes | apt-get install avahi-daemon').readlines()
-        if 'E:' in dnsmasq_install_result[-1]:
-            raise shutil.ExecError('Error setting up DNSMasq service')
-        shutil.copyfile(f'{self.enviroment["GENERATED_FOLDER"]}/configs/dnsmasq.conf', homepose.libs.vars.DNSMASQ_CONF_TARGET_FILE_PATH)
-        os.system('systemctl restart dnsmasq.service')
+                return line.strip()[5:line.find('/')-4]
+        return ''
+
+    def export_host_variables(self) -> None:
+        if self.host_ip_address:
+            os.environ.setdefault('HOMEPOSE_IP_ADDRESS', self.host_ip_address)
+            os.environ.setdefault('HOSTNAME', os.popen('hostname').read().rstrip())
+        for service_name in self.enviroment.get_all_services():
+            address_variable = f'{service_name.upper()}_ADDRESS'
+            service_address = self.get_service_address(service_name)
+            if service_address and os.environ.get(address_variable, self.__exported_addresses.get(address_variable)) == self.__exported_addresses.get(address_variable):
+                os.environ[address_variable] = self.__exported_addresses[address_variable] = service_address
+
+    def get_service_address(self, service_name: str) -> str:
+        return self.enviroment.placement.get_host(service_name).address or self.host_ip_address
+
+    @functools.cached_property
+    def provisioner(self) -> homepose.libs.provisioning.HomeposeHostProvisioner:
+        return homepose.libs.provisioning.HomeposeHostProvisioner(
+            f'{self.enviroment["GENERATED_FOLDER"]}/{homepose.libs.vars.PROVISIONING_STATE_FILENAME}',
+            self.command_runner
+        )
+
+    @functools.cached_property
+    def hosts_file(self) -> homepose.libs.hosts.HomeposeHostsFile:
+        return homepose.libs.hosts.HomeposeHostsFile(self.enviroment['HOSTS_FILE_PATH'] or homepose.libs.vars.HOSTS_TARGET_FILE_PATH)
+
+    def get_gateways(self) -> dict:
+        if self.__additional_gateways is None:
+            self.__additional_gateways = {}
+            with contextlib.suppress(FileNotFoundError):
+                with open(self.get_gateways_file_path(), 'r', encoding='utf-8') as gateways_file:
+                    self.__additional_gateways = json.load(gateways_file).get('gateways', {})
+        return dict(self.__additional_gateways)
+
+    def get_gateways_file_path(self) -> str:
+        return f'{self.enviroment["GENERATED_FOLDER"]}/{homepose.libs.vars.GATEWAYS_FILENAME}'
+
+    def save_gateways(self) -> None:
+        homepose.libs.files.write_atomically(
+            self.get_gateways_file_path(),
+            json.dumps({'gateways': self.get_gateways()}, indent=2, sort_keys=True).encode('utf-8')
+        )
+
+    def configure_dns(self) -> bool:
+        if installed_packages := self.provisioner.ensure_packages(homepose.libs.vars.DNS_PACKAGES):
+            homepose.libs.utils.HomeposeLogger().info(f' Installed packages: {", ".join(installed_packages)}')
+        if not self.provisioner.install_file(
+            f'{self.enviroment["GENERATED_FOLDER"]}/configs/dnsmasq.conf',
+            self.enviroment['DNSMASQ_CONF_PATH'] or homepose.libs.vars.DNSMASQ_CONF_TARGET_FILE_PATH
+        ):
+            return False
+        homepose.libs.utils.HomeposeLogger().info(' DNSMasq configuration changed, reloading DNSMasq')
+        self.provisioner.reload_service(homepose.libs.vars.DNSMASQ_SERVICE_NAME)
+        return True
+
+    def get_resolved_host_address(self) -> typing.Optional[str]:
+        return self.__dict__.get('host_ip_address')
 
     def add_gateway(self, address: str, name: str):
-        if address != self.host_ip_address:
-            self.__additional_gateways[name] = address
-
-    def broadcast_gateways(self, services_list: list):
-        gateways_entries = [
-            f'{additional_gateway_address} {additional_gateway_name}\n'
-            for additional_gateway_name, additional_gateway_address in self.__additional_gateways.items()
-        ] + [
-            f'{self.host_ip_address} {service_name}\n'
-            for service_name in services_list
-        ]
-
-        new_hosts_file_contents = self.__hosts_file_contents
-        for entry in gateways_entries:
-            if entry not in self.__hosts_file_contents:
-                new_hosts_file_contents += entry
-
-        with open(homepose.libs.vars.HOSTS_TARGET_FILE_PATH, 'w', encoding='utf-8') as current_hosts_file:
-            current_hosts_file.truncate(0)
-            current_hosts_file.write(new_hosts_file_contents)
+        with self.__gateways_lock:
+            if address != self.get_resolved_host_address() and self.get_gateways().get(name) != address:
+                self.__additional_gateways = {**self.get_gateways(), name: address}
+                self.save_gateways()
+
+    def remove_gateway(self, name: str) -> None:
+        with self.__gateways_lock:
+            if name in self.get_gateways():
+                self.__additional_gateways = {
+                    gateway_name: gateway_address
+                    for gateway_name, gateway_address in self.get_gateways().items()
+                    if gateway_name != name
+                }
+                self.save_gateways()
+
+    def broadcast_gateways(self, services_list: list) -> bool:
+        if not self.update_hosts(services_list):
+            return False
+        self.provisioner.reload_service(homepose.libs.vars.DNSMASQ_SERVICE_NAME)
+        return True
+
+    def update_hosts(self, services_list: list) -> bool:
+        gateways_entries = {
+            **{service_name: self.get_service_address(service_name) for service_name in services_list},
+            **self.get_gateways()
+        }
+        with self.__hosts_lock:
+            self.hosts_file.read()
+            added_entries, removed_entries, updated_entries = self.hosts_file.get_diff(gateways_entries)
+            if not self.hosts_file.apply(gateways_entries):
+                return False
+        homepose.libs.utils.HomeposeLogger().info(
+            f' Hosts file updated: {len(added_entries)} added, {len(removed_entries)} removed, {len(updated_entries)} updated'
+        )
+        return True
+
+    def update_proxy_locations(self, services_list: list) -> bool:
+        location_template_path = f'{self.enviroment["TEMPLATES_FOLDER"]}/configs/{homepose.libs.vars.PROXY_LOCATION_TEMPLATE}'
+        locations_folder = f'{self.enviroment["GENERATED_FOLDER"]}/{homepose.libs.vars.PROXY_LOCATIONS_FOLDER_NAME}'
+        if not os.path.exists(location_template_path):
+            return False
+        os.makedirs(locations_folder, exist_ok=True)
+        current_locations = set()
+        were_locations_changed = False
+        for service_name in services_list:
+            if not (service_port := self.enviroment[f'{service_name.upper()}_PORT']):
+                continue
+            current_locations.add(f'{service_name}.location')
+            was_written, _ = homepose.libs.templating.TEMPLATE_ENGINE.render_to_file(
+                location_template_path,
+                f'{locations_folder}/{service_name}.location',
+                {
+                    **os.environ,
+                    'SERVICE_NAME': service_name,
+                    'SERVICE_PORT': service_port,
+                    'SERVICE_ADDRESS': self.get_service_address(service_name) or 'localhost'
+                }
+            )
+            were_locations_changed |= was_written
+        for stale_location in set(os.listdir(locations_folder)) - current_locations:
+            os.remove(f'{locations_folder}/{stale_location}')
+            were_locations_changed = True
+        return were_locations_changed
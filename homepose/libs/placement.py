@@ -0,0 +1,164 @@
+import dataclasses
+import os
+import shutil
+
+import homepose.libs.compose
+import homepose.libs.scheduling
+import homepose.libs.vars
+
+
+@dataclasses.dataclass
+class HomeposeDockerHost():
+    name: str
+    docker_url: str = dataclasses.field(default='')
+    address: str = dataclasses.field(default='')
+    capacity: float = dataclasses.field(default=homepose.libs.vars.DEFAULT_HOST_CAPACITY)
+
+    def is_remote(self) -> bool:
+        return bool(self.docker_url) and not self.docker_url.startswith(homepose.libs.vars.LOCAL_DOCKER_URL_PREFIX)
+
+
+@dataclasses.dataclass
+class HomeposePlacement():
+    hosts: dict
+    assignments: dict = dataclasses.field(default_factory=dict)
+    loads: dict = dataclasses.field(init=False, default_factory=dict)
+    unreachable_dependencies: dict = dataclasses.field(init=False, default_factory=dict)
+
+    def __post_init__(self) -> None:
+        if not self.hosts:
+            raise shutil.ExecError('At least one Docker host has to be defined!')
+        self.loads = {host_name: 0.0 for host_name in self.hosts}
+
+    @classmethod
+    def from_config(cls, services_list: list, config: dict) -> 'HomeposePlacement':
+        placement = cls(cls.read_hosts(config))
+        weights = {
+            service_name: float(config.get(f'{service_name.upper()}_WEIGHT') or homepose.libs.vars.DEFAULT_SERVICE_WEIGHT)
+            for service_name in services_list
+        }
+        is_distributed = len(placement.hosts) > 1
+        published_services = cls.read_published_services(services_list, config['COMPOSE_FILES_FOLDER']) if is_distributed else set()
+        services_groups = cls.get_colocated_groups(services_list, config, published_services) if is_distributed else [[service_name] for service_name in services_list]
+        scheduled_groups = []
+        for services_group in services_groups:
+            pinned_hosts = {
+                host_name
+                for service_name in services_group
+                if (host_name := placement.get_pinned_host(service_name, config)) != homepose.libs.vars.AUTO_PLACEMENT
+            }
+            if len(pinned_hosts) > 1:
+                raise shutil.ExecError(
+                    f'Services {", ".join(services_group)} depend on each other and have to share a Docker host, '
+                    f'but are placed on {", ".join(sorted(pinned_hosts))}!'
+                )
+            if pinned_hosts:
+                placement.assign_group(services_group, pinned_hosts.pop(), weights)
+            else:
+                scheduled_groups.append(services_group)
+        for services_group in sorted(scheduled_groups, key=lambda services_group: (-sum(weights[service_name] for service_name in services_group), services_group)):
+            placement.assign_group(services_group, placement.get_least_loaded_host(sum(weights[service_name] for service_name in services_group)), weights)
+        if is_distributed:
+            placement.unreachable_dependencies = placement.find_unreachable_dependencies(
+                homepose.libs.scheduling.HomeposeServiceGraph.from_config(services_list, config),
+                published_services
+            )
+        return placement
+
+    def get_pinned_host(self, service_name: str, config: dict) -> str:
+        host_name = (config.get(f'{service_name.upper()}_PLACEMENT') or homepose.libs.vars.AUTO_PLACEMENT).strip()
+        if host_name != homepose.libs.vars.AUTO_PLACEMENT and host_name not in self.hosts:
+            raise shutil.ExecError(f'Service {service_name} is placed on unknown Docker host {host_name}!')
+        if service_name != config.get('REVERSE_PROXY_NAME'):
+            return host_name
+        primary_host_name = self.get_primary_host().name
+        if host_name not in (homepose.libs.vars.AUTO_PLACEMENT, primary_host_name):
+            raise shutil.ExecError(
+                f'Reverse proxy {service_name} discovers services through the local Docker socket '
+                f'and has to run on the primary Docker host {primary_host_name}!'
+            )
+        return primary_host_name
+
+    @staticmethod
+    def get_colocated_groups(services_list: list, config: dict, published_services: set) -> list:
+        declared_dependencies = homepose.libs.scheduling.HomeposeServiceGraph.read_declared_dependencies(services_list, config)
+        groups = {service_name: {service_name} for service_name in services_list}
+        for service_name, dependencies in declared_dependencies.items():
+            for dependency in (dependencies & set(services_list)) - published_services - {service_name}:
+                merged_group = groups[service_name] | groups[dependency]
+                for grouped_service in merged_group:
+                    groups[grouped_service] = merged_group
+        return [
+            list(services_group)
+            for services_group in dict.fromkeys(
+                tuple(grouped_service for grouped_service in services_list if grouped_service in groups[service_name])
+                for service_name in services_list
+            )
+        ]
+
+    @staticmethod
+    def read_published_services(services_list: list, compose_files_folder: str) -> set:
+        published_services = set()
+        for service_name in services_list:
+            compose_file_path = f'{compose_files_folder}/{service_name}/docker-compose.yml'
+            if not os.path.exists(compose_file_path):
+                continue
+            compose_definition = homepose.libs.compose.read_compose_file(compose_file_path)
+            if any((compose_service or {}).get('ports') for compose_service in (compose_definition.get('services') or {}).values()):
+                published_services.add(service_name)
+        return published_services
+
+    @staticmethod
+    def read_hosts(config: dict) -> dict:
+        hosts_names = [host_name.strip() for host_name in (config.get('DOCKER_HOSTS') or '').split(',') if host_name.strip()]
+        if not hosts_names:
+            return {homepose.libs.vars.LOCAL_DOCKER_HOST_NAME: HomeposeDockerHost(homepose.libs.vars.LOCAL_DOCKER_HOST_NAME)}
+        return {
+            host_name: HomeposeDockerHost(
+                host_name,
+                config.get(f'{host_name.upper()}_DOCKER_URL') or '',
+                config.get(f'{host_name.upper()}_HOST_ADDRESS') or '',
+                float(config.get(f'{host_name.upper()}_CAPACITY') or homepose.libs.vars.DEFAULT_HOST_CAPACITY)
+            )
+            for host_name in hosts_names
+        }
+
+    def find_unreachable_dependencies(self, services_graph: homepose.libs.scheduling.HomeposeServiceGraph, published_services: set) -> dict:
+        return {
+            service_name: sorted(unreachable_dependencies)
+            for service_name, dependencies in services_graph.dependencies.items()
+            if (unreachable_dependencies := {
+                dependency
+                for dependency in (dependencies & self.assignments.keys()) - published_services
+                if self.assignments[dependency] != self.assignments[service_name]
+            })
+        }
+
+    def assign(self, service_name: str, host_name: str, weight: float) -> None:
+        self.assignments[service_name] = host_name
+        self.loads[host_name] += weight
+
+    def assign_group(self, services_group: list, host_name: str, weights: dict) -> None:
+        for service_name in services_group:
+            self.assign(service_name, host_name, weights[service_name])
+
+    def get_least_loaded_host(self, weight: float) -> str:
+        available_hosts = [host for host in self.hosts.values() if host.capacity > 0]
+        if not available_hosts:
+            raise shutil.ExecError('None of the Docker hosts has any capacity left for automatic placement!')
+        return min(available_hosts, key=lambda host: (self.loads[host.name] + weight) / host.capacity).name
+
+    def get_primary_host(self) -> HomeposeDockerHost:
+        return next(iter(self.hosts.values()))
+
+    def get_host(self, service_name: str) -> HomeposeDockerHost:
+        return self.hosts.get(self.assignments.get(service_name, ''), self.get_primary_host())
+
+    def group_by_host(self, services_list: list) -> dict:
+        services_by_host: dict = {host_name: [] for host_name in self.hosts}
+        for service_name in services_list:
+            services_by_host[self.get_host(service_name).name].append(service_name)
+        return services_by_host
+
+    def get_overloaded_hosts(self) -> list:
+        return [host.name for host in self.hosts.values() if self.loads[host.name] > host.capacity]
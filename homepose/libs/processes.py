@@ -0,0 +1,79 @@
+import collections
+import dataclasses
+import logging
+import subprocess
+import threading
+import typing
+
+import homepose.libs.utils
+import homepose.libs.vars
+
+
+@dataclasses.dataclass
+class HomeposeOutputSink():  # pylint: disable=R0902
+    logpath: str
+    logger: typing.Union[homepose.libs.utils.HomeposeLogger, homepose.libs.utils.HomeposeServiceLogger, None] = dataclasses.field(default=None)
+    log_level: int = dataclasses.field(default=logging.DEBUG)
+    tail_size: int = dataclasses.field(default=homepose.libs.vars.DEFAULT_OUTPUT_TAIL_LINES)
+
+    output_bytes: int = dataclasses.field(init=False, default=0)
+    __tail: collections.deque = dataclasses.field(init=False)
+    __logfile: typing.Optional[typing.TextIO] = dataclasses.field(init=False, default=None)
+    __lock: threading.Lock = dataclasses.field(init=False, default_factory=threading.Lock)
+
+    def __post_init__(self) -> None:
+        self.__tail = collections.deque(maxlen=max(self.tail_size, 1))
+
+    def __enter__(self) -> 'HomeposeOutputSink':
+        self.__logfile = open(self.logpath, 'w', encoding='utf-8')  # pylint: disable=R1732
+        return self
+
+    def __exit__(self, *_) -> None:
+        if self.__logfile:
+            self.__logfile.close()
+            self.__logfile = None
+
+    def write_line(self, line: typing.Union[str, bytes]) -> None:
+        if isinstance(line, bytes):
+            line_size = len(line)
+            line = line.decode('utf-8', errors='replace')
+        else:
+            line_size = len(line.encode('utf-8', errors='replace'))
+        with self.__lock:
+            self.output_bytes += line_size
+            if self.__logfile:
+                self.__logfile.write(line if line.endswith('\n') else f'{line}\n')
+                self.__logfile.flush()
+            self.__tail.append(line.rstrip('\n'))
+        if self.logger and line.strip():
+            self.logger.log(f'   {line.rstrip()}', self.log_level)
+
+    def get_tail(self) -> str:
+        with self.__lock:
+            return '\n'.join(self.__tail)
+
+
+@dataclasses.dataclass
+class HomeposeStreamingRunner():
+    sink: HomeposeOutputSink
+    returncode: typing.Optional[int] = dataclasses.field(init=False, default=None)
+
+    def run(self, command: str, variables: typing.Optional[dict] = None) -> int:
+        with self.sink, subprocess.Popen(command, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, env=variables) as process:
+            readers = [
+                threading.Thread(target=self.forward_lines, args=(pipe,), daemon=True)
+                for pipe in (process.stdout, process.stderr)
+            ]
+            for reader in readers:
+                reader.start()
+            for reader in readers:
+                reader.join()
+            self.returncode = process.wait()
+        return self.returncode
+
+    def forward_lines(self, pipe: typing.IO[bytes]) -> None:
+        for line in iter(pipe.readline, b''):
+            self.sink.write_line(line)
+
+    def get_tail(self) -> str:
+        return self.sink.get_tail()
@@ -0,0 +1,88 @@
+import dataclasses
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import threading
+
+import homepose.libs.files
+import homepose.libs.vars
+
+
+@dataclasses.dataclass
+class HomeposeCommandRunner():
+    environment: dict = dataclasses.field(default_factory=lambda: {'DEBIAN_FRONTEND': 'noninteractive'})
+
+    def run(self, command: list) -> tuple:
+        try:
+            finished_process = subprocess.run(
+                command,
+                capture_output=True,
+                text=True,
+                env={**os.environ, **self.environment},
+                check=False
+            )
+        except OSError as encountered_error:
+            return 127, str(encountered_error)
+        return finished_process.returncode, f'{finished_process.stdout}{finished_process.stderr}'
+
+
+@dataclasses.dataclass
+class HomeposeHostProvisioner():
+    state_file_path: str
+    runner: HomeposeCommandRunner = dataclasses.field(default_factory=HomeposeCommandRunner)
+    installed_packages: set = dataclasses.field(init=False, default_factory=set)
+
+    __lock: threading.Lock = dataclasses.field(init=False, default_factory=threading.Lock)
+
+    def __post_init__(self) -> None:
+        if os.path.exists(self.state_file_path):
+            with open(self.state_file_path, 'r', encoding='utf-8') as state_file:
+                self.installed_packages = set(json.load(state_file).get('installed_packages', []))
+
+    def ensure_packages(self, packages: tuple) -> list:
+        with self.__lock:
+            unknown_packages = [package for package in packages if package not in self.installed_packages]
+            if not unknown_packages:
+                return []
+            missing_packages = [package for package in unknown_packages if not self.is_package_installed(package)]
+            if missing_packages:
+                returncode, output = self.runner.run(['apt-get', 'install', '-y', *missing_packages])
+                if returncode != 0:
+                    raise shutil.ExecError(f'Error installing packages {", ".join(missing_packages)}: {output.strip()}')
+            self.installed_packages |= set(unknown_packages)
+            self.save()
+            return missing_packages
+
+    def is_package_installed(self, package: str) -> bool:
+        returncode, output = self.runner.run(['dpkg-query', '-W', '-f=${Status}', package])
+        return returncode == 0 and output.split()[-1:] == ['installed']
+
+    @staticmethod
+    def get_file_hash(file_path: str) -> str:
+        if not os.path.exists(file_path):
+            return ''
+        file_hash = hashlib.sha256()
+        with open(file_path, 'rb') as hashed_file:
+            while chunk := hashed_file.read(homepose.libs.vars.HASHING_CHUNK_SIZE):
+                file_hash.update(chunk)
+        return file_hash.hexdigest()
+
+    def install_file(self, source_path: str, target_path: str) -> bool:
+        if self.get_file_hash(source_path) == self.get_file_hash(target_path):
+            return False
+        with open(source_path, 'rb') as source_file:
+            homepose.libs.files.write_atomically(target_path, source_file.read())
+        return True
+
+    def reload_service(self, service_name: str) -> None:
+        returncode, output = self.runner.run(['systemctl', 'restart', f'{service_name}.service'])
+        if returncode != 0:
+            raise shutil.ExecError(f'Error restarting {service_name} service: {output.strip()}')
+
+    def save(self) -> None:
+        homepose.libs.files.write_atomically(
+            self.state_file_path,
+            json.dumps({'installed_packages': sorted(self.installed_packages)}, indent=2).encode('utf-8')
+        )
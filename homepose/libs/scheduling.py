@@ -0,0 +1,170 @@
+import concurrent.futures
+import dataclasses
+import os
+import shutil
+import typing
+
+import homepose.libs.compose
+import homepose.libs.vars
+
+
+@dataclasses.dataclass
+class HomeposeServiceGraph():
+    services: list
+    dependencies: dict = dataclasses.field(default_factory=dict)
+    deferred_services: set = dataclasses.field(default_factory=set)
+
+    def __post_init__(self) -> None:
+        self.deferred_services = {service_name for service_name in self.deferred_services if service_name in self.services}
+        for service_name in self.services:
+            self.dependencies.setdefault(service_name, set())
+        self.dependencies = {
+            service_name: {
+                dependency
+                for dependency in dependencies
+                if dependency in self.services and dependency != service_name
+            }
+            for service_name, dependencies in self.dependencies.items()
+            if service_name in self.services
+        }
+        self.ordered()
+
+    @classmethod
+    def from_config(cls, services_list: list, config: dict) -> 'HomeposeServiceGraph':
+        database_backend = config.get('DATABASE_BACKEND')
+        dependencies = cls.read_declared_dependencies(services_list, config)
+        for service_name in services_list:
+            if database_backend and service_name != database_backend:
+                dependencies[service_name].add(database_backend)
+        return cls(list(services_list), dependencies, {config.get('REVERSE_PROXY_NAME')})
+
+    @classmethod
+    def read_declared_dependencies(cls, services_list: list, config: dict) -> dict:
+        dependencies: dict = {service_name: set() for service_name in services_list}
+        for service_name, compose_dependencies in cls.read_compose_dependencies(services_list, config['COMPOSE_FILES_FOLDER']).items():
+            dependencies[service_name] |= compose_dependencies
+        for service_name in services_list:
+            if declared_dependencies := config.get(f'{service_name.upper()}_DEPENDS_ON'):
+                dependencies[service_name] |= {
+                    dependency.strip()
+                    for dependency in declared_dependencies.split(',')
+                    if dependency.strip()
+                }
+        return dependencies
+
+    @staticmethod
+    def read_compose_dependencies(services_list: list, compose_files_folder: str) -> dict:
+        owners: dict = {}
+        declared_dependencies: dict = {}
+        for service_name in services_list:
+            compose_file_path = f'{compose_files_folder}/{service_name}/docker-compose.yml'
+            if not os.path.exists(compose_file_path):
+                continue
+            compose_definition = homepose.libs.compose.read_compose_file(compose_file_path)
+            declared_dependencies[service_name] = set()
+            for compose_service_name, compose_service in (compose_definition.get('services') or {}).items():
+                compose_service = compose_service or {}
+                for alias in (compose_service_name, compose_service.get('container_name'), compose_service.get('hostname')):
+                    if alias:
+                        owners.setdefault(str(alias).strip(), service_name)
+                depends_on = compose_service.get('depends_on') or []
+                declared_dependencies[service_name] |= {str(dependency).strip() for dependency in depends_on}
+        return {
+            service_name: {
+                owners[dependency]
+                for dependency in dependencies
+                if owners.get(dependency, service_name) != service_name
+            }
+            for service_name, dependencies in declared_dependencies.items()
+        }
+
+    def dependents_of(self, service_name: str) -> set:
+        dependents: set = set()
+        pending = [service_name]
+        while pending:
+            current_service = pending.pop()
+            for candidate, dependencies in self.dependencies.items():
+                if current_service in dependencies and candidate not in dependents:
+                    dependents.add(candidate)
+                    pending.append(candidate)
+        return dependents
+
+    def ordered(self) -> list:
+        ordered_services: list = []
+        remaining_services = list(self.services)
+        while remaining_services:
+            ready_services = [
+                service_name
+                for service_name in remaining_services
+                if self.dependencies[service_name] <= set(ordered_services)
+                and (service_name not in self.deferred_services or set(remaining_services) <= self.deferred_services)
+            ]
+            if not ready_services:
+                raise shutil.ExecError(f'Circular dependency detected between services: {", ".join(remaining_services)}')
+            ordered_services.extend(ready_services)
+            remaining_services = [
+                service_name
+                for service_name in remaining_services
+                if service_name not in ready_services
+            ]
+        return ordered_services
+
+
+@dataclasses.dataclass
+class HomeposeScheduler():
+    graph: HomeposeServiceGraph
+    max_workers: int = dataclasses.field(default=homepose.libs.vars.DEFAULT_DEPLOYMENT_WORKERS)
+
+    results: dict = dataclasses.field(init=False, default_factory=dict)
+
+    def run(self, deploy_service: typing.Callable[[str], None]) -> dict:
+        self.results = {}
+        pending_services = list(self.graph.ordered())
+        running_deployments: dict = {}
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max(self.max_workers, 1)) as executor:
+            while pending_services or running_deployments:
+                for service_name in list(pending_services):
+                    if self.is_ready(service_name, pending_services, running_deployments):
+                        pending_services.remove(service_name)
+                        running_deployments[executor.submit(deploy_service, service_name)] = service_name
+                if not running_deployments:
+                    break
+                finished_deployments, _ = concurrent.futures.wait(
+                    running_deployments,
+                    return_when=concurrent.futures.FIRST_COMPLETED
+                )
+                for deployment in finished_deployments:
+                    service_name = running_deployments.pop(deployment)
+                    if deployment.exception() is None:
+                        self.results[service_name] = homepose.libs.vars.SERVICE_STATUS_DONE
+                        continue
+                    self.results[service_name] = deployment.exception()
+                    for dependent in self.graph.dependents_of(service_name):
+                        if dependent in pending_services:
+                            pending_services.remove(dependent)
+                            self.results[dependent] = homepose.libs.vars.SERVICE_STATUS_CANCELLED
+        return self.results
+
+    def is_ready(self, service_name: str, pending_services: list, running_deployments: dict) -> bool:
+        if any(
+            self.results.get(dependency) != homepose.libs.vars.SERVICE_STATUS_DONE
+            for dependency in self.graph.dependencies[service_name]
+        ):
+            return False
+        if service_name in self.graph.deferred_services:
+            return not running_deployments and set(pending_services) <= self.graph.deferred_services
+        return True
+
+    def get_failures(self) -> dict:
+        return {
+            service_name: result
+            for service_name, result in self.results.items()
+            if isinstance(result, BaseException)
+        }
+
+    def get_cancelled(self) -> list:
+        return [
+            service_name
+            for service_name, result in self.results.items()
+            if result == homepose.libs.vars.SERVICE_STATUS_CANCELLED
+        ]
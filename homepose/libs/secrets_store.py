@@ -0,0 +1,64 @@
+import dataclasses
+import json
+import os
+import secrets
+import threading
+
+import dotenv
+
+import homepose.libs.files
+import homepose.libs.vars
+
+
+@dataclasses.dataclass
+class HomeposeSecretsStore():
+    store_file_path: str
+    secret_size: int = dataclasses.field(default=homepose.libs.vars.SECRET_SIZE_BYTES)
+    secrets: dict = dataclasses.field(init=False, default_factory=dict)
+
+    __lock: threading.Lock = dataclasses.field(init=False, default_factory=threading.Lock)
+
+    def __post_init__(self) -> None:
+        if os.path.exists(self.store_file_path):
+            with open(self.store_file_path, 'r', encoding='utf-8') as store_file:
+                self.secrets = json.load(store_file).get('secrets', {})
+
+    def __getitem__(self, service_name: str) -> str:
+        return self.secrets.get(service_name, '')
+
+    def ensure_secrets(self, services_list: list, legacy_env_files: dict) -> dict:
+        with self.__lock:
+            missing_services = [
+                service_name
+                for service_name in dict.fromkeys(services_list)
+                if service_name not in self.secrets
+            ]
+            if missing_services:
+                self.secrets.update({
+                    service_name: self.read_legacy_secret(service_name, legacy_env_files.get(service_name, '')) or self.generate_secret()
+                    for service_name in missing_services
+                })
+                self.save()
+            return {service_name: self.secrets[service_name] for service_name in services_list}
+
+    def rotate_secret(self, service_name: str) -> str:
+        with self.__lock:
+            self.secrets[service_name] = self.generate_secret()
+            self.save()
+            return self.secrets[service_name]
+
+    def generate_secret(self) -> str:
+        return secrets.token_hex(self.secret_size)
+
+    @staticmethod
+    def read_legacy_secret(service_name: str, env_file_path: str) -> str:
+        if not env_file_path or not os.path.exists(env_file_path):
+            return ''
+        return dotenv.dotenv_values(env_file_path).get(f'{service_name.upper()}_SECRET') or ''
+
+    def save(self) -> None:
+        homepose.libs.files.write_atomically(
+            self.store_file_path,
+            json.dumps({'secrets': self.secrets}, indent=2, sort_keys=True).encode('utf-8'),
+            0o600
+        )
@@ -0,0 +1,60 @@
+import dataclasses
+import hashlib
+import json
+import os
+import re
+
+import homepose.libs.files
+import homepose.libs.vars
+
+
+ENV_VAR_REFERENCE_PATTERN = re.compile(r'\$\{([A-Za-z_][A-Za-z0-9_]*)[^}]*\}|\$([A-Za-z_][A-Za-z0-9_]*)|\[([A-Za-z_][A-Za-z0-9_]*)\]')
+
+
+@dataclasses.dataclass
+class HomeposeDeploymentState():
+    state_file_path: str
+    fingerprints: dict = dataclasses.field(init=False, default_factory=dict)
+
+    def __post_init__(self) -> None:
+        if os.path.exists(self.state_file_path):
+            with open(self.state_file_path, 'r', encoding='utf-8') as state_file:
+                self.fingerprints = json.load(state_file).get('fingerprints', {})
+
+    def __getitem__(self, service_name: str) -> str:
+        return self.fingerprints.get(service_name, '')
+
+    def __setitem__(self, service_name: str, fingerprint: str) -> None:
+        self.fingerprints[service_name] = fingerprint
+
+    def forget(self, service_name: str) -> None:
+        self.fingerprints.pop(service_name, None)
+
+    def get_known_services(self) -> list:
+        return list(self.fingerprints.keys())
+
+    def save(self) -> None:
+        homepose.libs.files.write_atomically(
+            self.state_file_path,
+            json.dumps({'fingerprints': self.fingerprints}, indent=2, sort_keys=True).encode('utf-8')
+        )
+
+
+def fingerprint_files(files_paths: list, variables: dict) -> str:
+    fingerprint = hashlib.sha256()
+    referenced_variables: set = set()
+    for file_path in files_paths:
+        fingerprint.update(file_path.encode())
+        if not os.path.exists(file_path):
+            fingerprint.update(homepose.libs.vars.MISSING_FILE_FINGERPRINT_MARKER)
+            continue
+        with open(file_path, 'rb') as fingerprinted_file:
+            file_contents = fingerprinted_file.read()
+        fingerprint.update(hashlib.sha256(file_contents).digest())
+        referenced_variables |= {
+            next(name for name in reference if name)
+            for reference in ENV_VAR_REFERENCE_PATTERN.findall(file_contents.decode('utf-8', errors='replace'))
+        }
+    for variable_name in sorted(referenced_variables):
+        fingerprint.update(f'{variable_name}={variables.get(variable_name, "")}\n'.encode())
+    return fingerprint.hexdigest()
@@ -0,0 +1,68 @@
+import dataclasses
+import os
+import re
+import threading
+import typing
+
+import homepose.libs.files
+
+
+TEMPLATE_MARKER_PATTERN = re.compile(r'\[([A-Za-z_][A-Za-z0-9_]*)\]')
+
+
+@dataclasses.dataclass(frozen=True)
+class HomeposeCompiledTemplate():
+    literals: tuple
+    markers: tuple
+
+    @classmethod
+    def compile(cls, template_contents: str) -> 'HomeposeCompiledTemplate':
+        tokens = TEMPLATE_MARKER_PATTERN.split(template_contents)
+        return cls(tuple(tokens[::2]), tuple(tokens[1::2]))
+
+    def render(self, variables: typing.Mapping[str, str]) -> typing.Tuple[str, set]:
+        rendered_chunks = [self.literals[0]]
+        undefined_markers = set()
+        for marker, literal in zip(self.markers, self.literals[1:]):
+            if marker in variables:
+                rendered_chunks.append(variables[marker])
+            else:
+                undefined_markers.add(marker)
+                rendered_chunks.append(f'[{marker}]')
+            rendered_chunks.append(literal)
+        return ''.join(rendered_chunks), undefined_markers
+
+
+@dataclasses.dataclass
+class HomeposeTemplateEngine():
+    __compiled_templates: dict = dataclasses.field(init=False, default_factory=dict)
+    __lock: threading.Lock = dataclasses.field(init=False, default_factory=threading.Lock)
+
+    def load(self, template_path: str) -> HomeposeCompiledTemplate:
+        template_stats = os.stat(template_path)
+        cache_key = (template_stats.st_mtime_ns, template_stats.st_size)
+        with self.__lock:
+            cached_entry = self.__compiled_templates.get(template_path)
+        if cached_entry and cached_entry[0] == cache_key:
+            return cached_entry[1]
+        with open(template_path, 'r', encoding='utf-8') as template_file:
+            compiled_template = HomeposeCompiledTemplate.compile(template_file.read())
+        with self.__lock:
+            self.__compiled_templates[template_path] = (cache_key, compiled_template)
+        return compiled_template
+
+    def render_file(self, template_path: str, variables: typing.Mapping[str, str]) -> typing.Tuple[str, set]:
+        return self.load(template_path).render(variables)
+
+    def render_to_file(self, template_path: str, target_path: str, variables: typing.Mapping[str, str]) -> typing.Tuple[bool, set]:
+        rendered_contents, undefined_markers = self.render_file(template_path, variables)
+        rendered_bytes = rendered_contents.encode('utf-8')
+        if os.path.exists(target_path):
+            with open(target_path, 'rb') as target_file:
+                if target_file.read() == rendered_bytes:
+                    return False, undefined_markers
+        homepose.libs.files.write_atomically(target_path, rendered_bytes)
+        return True, undefined_markers
+
+
+TEMPLATE_ENGINE = HomeposeTemplateEngine()
@@ -0,0 +1,162 @@
+import contextlib
+import dataclasses
+import functools
+import json
+import os
+import threading
+import time
+import typing
+
+import homepose.libs.vars
+
+
+@dataclasses.dataclass
+class HomeposeSpan():  # pylint: disable=R0902
+    span_id: int
+    name: str
+    service_name: str = dataclasses.field(default='')
+    parent_id: typing.Optional[int] = dataclasses.field(default=None)
+    started_at: float = dataclasses.field(default_factory=time.time)
+    duration: float = dataclasses.field(default=0.0)
+    status: str = dataclasses.field(default=homepose.libs.vars.SPAN_STATUS_RUNNING)
+    exit_code: typing.Optional[int] = dataclasses.field(default=None)
+    output_bytes: int = dataclasses.field(default=0)
+    error: str = dataclasses.field(default='')
+
+    def to_dict(self) -> dict:
+        return dataclasses.asdict(self)
+
+
+@dataclasses.dataclass
+class HomeposeTimer():
+    __local: threading.local = dataclasses.field(init=False, default_factory=threading.local)
+    __lock: threading.Lock = dataclasses.field(init=False, default_factory=threading.Lock)
+
+    @property
+    def spans(self) -> list:
+        return getattr(self.__local, 'spans', [])
+
+    def get_root_span(self) -> typing.Optional[HomeposeSpan]:
+        return getattr(self.__local, 'root_span', None)
+
+    def is_running(self) -> bool:
+        return self.get_root_span() is not None
+
+    def get_active_spans(self) -> list:
+        if not hasattr(self.__local, 'active_spans'):
+            self.__local.active_spans = []
+        return self.__local.active_spans
+
+    def get_current_span(self) -> typing.Optional[HomeposeSpan]:
+        active_spans = self.get_active_spans()
+        return active_spans[-1] if active_spans else self.get_root_span()
+
+    @contextlib.contextmanager
+    def span(self, name: str, service_name: str = '') -> typing.Iterator[HomeposeSpan]:
+        parent_span = self.get_current_span()
+        run_spans = self.spans
+        with self.__lock:
+            new_span = HomeposeSpan(
+                len(run_spans) + 1,
+                name,
+                service_name or (parent_span.service_name if parent_span else ''),
+                parent_span.span_id if parent_span else None
+            )
+            run_spans.append(new_span)
+        started_at = time.perf_counter()
+        self.get_active_spans().append(new_span)
+        try:
+            yield new_span
+            new_span.status = homepose.libs.vars.SPAN_STATUS_OK
+        except BaseException as encountered_exception:
+            new_span.status = homepose.libs.vars.SPAN_STATUS_ERROR
+            new_span.error = str(encountered_exception)
+            raise
+        finally:
+            new_span.duration = time.perf_counter() - started_at
+            self.get_active_spans().pop()
+
+    def bind(self, function: typing.Callable) -> typing.Callable:
+        parent_span = self.get_current_span()
+        root_span = self.get_root_span()
+        run_spans = self.spans
+
+        @functools.wraps(function)
+        def bound_function(*args, **kwargs):
+            if parent_span is None:
+                return function(*args, **kwargs)
+            previous_run = (self.get_root_span(), self.spans)
+            self.__local.root_span, self.__local.spans = root_span, run_spans
+            self.get_active_spans().append(parent_span)
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self.get_active_spans().pop()
+                self.__local.root_span, self.__local.spans = previous_run
+        return bound_function
+
+    @contextlib.contextmanager
+    def run(self, name: str, reports_folder: str = '', reports_retention: int = homepose.libs.vars.DEFAULT_REPORTS_RETENTION) -> typing.Iterator[HomeposeSpan]:
+        if self.is_running():
+            with self.span(name) as nested_span:
+                yield nested_span
+            return
+        self.__local.spans = []
+        try:
+            with self.span(name) as root_span:
+                self.__local.root_span = root_span
+                yield root_span
+        finally:
+            self.__local.root_span = None
+            if reports_folder:
+                self.write_report(f'{reports_folder}/{name}-{time.strftime("%Y%m%d-%H%M%S")}-{threading.get_native_id()}.jsonl')
+                self.prune_reports(reports_folder, reports_retention)
+
+    def record_output(self, output_bytes: int, exit_code: typing.Optional[int] = None) -> None:
+        if current_span := self.get_current_span():
+            with self.__lock:
+                current_span.output_bytes += output_bytes
+                if exit_code is not None:
+                    current_span.exit_code = exit_code
+
+    def write_report(self, report_path: str) -> None:
+        os.makedirs(os.path.dirname(report_path) or '.', exist_ok=True)
+        with open(report_path, 'w', encoding='utf-8') as report_file:
+            for recorded_span in self.spans:
+                report_file.write(json.dumps(recorded_span.to_dict(), sort_keys=True) + '\n')
+
+    @staticmethod
+    def prune_reports(reports_folder: str, reports_retention: int) -> list:
+        with contextlib.suppress(FileNotFoundError):
+            reports = []
+            for report_entry in os.scandir(reports_folder):
+                if report_entry.name.endswith('.jsonl'):
+                    with contextlib.suppress(FileNotFoundError):
+                        reports.append((report_entry.stat().st_mtime_ns, report_entry.path))
+            stale_reports = [report_path for _, report_path in sorted(reports, reverse=True)[max(reports_retention, 1):]]
+            for report_path in stale_reports:
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(report_path)
+            return stale_reports
+        return []
+
+    def get_slowest_spans(self, count: int) -> list:
+        child_spans = [recorded_span for recorded_span in self.spans if recorded_span.parent_id is not None]
+        return sorted(child_spans, key=lambda recorded_span: recorded_span.duration, reverse=True)[:count]
+
+    def format_summary(self, count: int) -> list:
+        slowest_spans = self.get_slowest_spans(count)
+        if not slowest_spans:
+            return []
+        name_width = max(len('STEP'), *(len(recorded_span.name) for recorded_span in slowest_spans))
+        service_width = max(len('SERVICE'), *(len(recorded_span.service_name) for recorded_span in slowest_spans))
+        summary_lines = [f'{"STEP":<{name_width}}  {"SERVICE":<{service_width}}  {"TIME [s]":>9}  {"OUTPUT [B]":>11}  STATUS']
+        summary_lines.extend(
+            f'{recorded_span.name:<{name_width}}  {recorded_span.service_name:<{service_width}}  '
+            f'{recorded_span.duration:>9.2f}  {recorded_span.output_bytes:>11}  {recorded_span.status}'
+            for recorded_span in slowest_spans
+        )
+        return summary_lines
+
+
+TIMER = HomeposeTimer()
@@ -2,6 +2,10 @@ import dataclasses
 import logging
 import os
 import shutil
+import typing
+
+import homepose.libs.templating
+import homepose.libs.vars
 
 
 @dataclasses.dataclass
@@ -54,26 +58,67 @@ class HomeposeLogger():
     def log(self, message: str, level: int) -> None:
         self._logger.log(level, message)
 
+    def for_service(self, service_name: str, logfile_path: str = '') -> 'HomeposeServiceLogger':
+        return HomeposeServiceLogger(service_name, logfile_path, parent_name=self._logger.name)
 
-def fill_templates(templates_path: str, generated_path: str) -> None:
-    for subfolder in os.listdir(templates_path):
-        for filename in os.listdir(f'{templates_path}/{subfolder}'):
-            with open(f'{templates_path}/{subfolder}/{filename}', 'r', encoding='utf8') as template:
-                filled_template = fill_template(template.read())
-                with open(f'{generated_path}/{subfolder}/{filename}', 'w', encoding='utf-8') as target_file:
-                    target_file.truncate(0)
-                    target_file.write(filled_template)
-            shutil.chown(f'{generated_path}/{subfolder}/{filename}', user=os.environ['SUDO_USER'], group=os.environ['SUDO_USER'])
 
+@dataclasses.dataclass
+class HomeposeServiceLogger():
+    service_name: str
+    logfile_path: str = dataclasses.field(default='')
+    parent_name: str = dataclasses.field(default=HomeposeLogger.name)
+    _logger: logging.Logger = dataclasses.field(init=False)
+    _file_handler: typing.Optional[logging.FileHandler] = dataclasses.field(init=False, default=None)
+
+    def __post_init__(self) -> None:
+        self._logger = logging.getLogger(f'{self.parent_name}.{self.service_name}')
+        self._logger.setLevel(logging.getLogger(self.parent_name).level)
+        for handler in list(self._logger.handlers):
+            self._logger.removeHandler(handler)
+            handler.close()
+        if self.logfile_path:
+            self._file_handler = logging.FileHandler(self.logfile_path, mode='w', encoding='utf-8')
+            self._file_handler.setFormatter(logging.Formatter(fmt='%(asctime)s :: %(levelname)s :: %(message)s'))
+            self._logger.addHandler(self._file_handler)
+
+    def info(self, message: str) -> None:
+        self.log(message, logging.INFO)
+
+    def error(self, message: str) -> None:
+        self.log(message, logging.ERROR)
+
+    def warning(self, message: str) -> None:
+        self.log(message, logging.WARNING)
 
-def fill_template(template_contents: str) -> str:
-    for variable_name, variable_value in os.environ.items():
-        entry_template_marker = f'[{variable_name}]'
-        if entry_template_marker in template_contents:
-            template_contents = template_contents.replace(entry_template_marker, variable_value)
-    return template_contents
+    def debug(self, message: str) -> None:
+        self.log(message, logging.DEBUG)
+
+    def log(self, message: str, level: int) -> None:
+        self._logger.log(level, message)
+
+    def close(self) -> None:
+        if self._file_handler:
+            self._logger.removeHandler(self._file_handler)
+            self._file_handler.close()
+            self._file_handler = None
 
 
-def generate_dockerfile(template_path: str) -> str:
-    with open(template_path, 'r', encoding='utf-8') as dockerfile_template:
-        return fill_template(dockerfile_template.read())
+def fill_templates(templates_path: str, generated_path: str) -> dict:
+    variables = dict(os.environ)
+    undefined_markers = {}
+    for subfolder in os.listdir(templates_path):
+        for filename in os.listdir(f'{templates_path}/{subfolder}'):
+            if filename in homepose.libs.vars.PER_SERVICE_TEMPLATES:
+                continue
+            target_path = f'{generated_path}/{subfolder}/{filename}'
+            was_written, template_undefined_markers = homepose.libs.templating.TEMPLATE_ENGINE.render_to_file(
+                f'{templates_path}/{subfolder}/{filename}',
+                target_path,
+                variables
+            )
+            if template_undefined_markers:
+                undefined_markers[f'{subfolder}/{filename}'] = template_undefined_markers
+                HomeposeLogger().warning(f' Undefined markers in template {subfolder}/{filename}: {", ".join(sorted(template_undefined_markers))}')
+            if was_written:
+                shutil.chown(target_path, user=os.environ['SUDO_USER'], group=os.environ['SUDO_USER'])
+    return undefined_markers
@@ -11,3 +11,75 @@ DEFAULT_WWW_DATA_GROUPID = 33
 
 HOSTS_TARGET_FILE_PATH = '/etc/hosts'
 DNSMASQ_CONF_TARGET_FILE_PATH = '/etc/dnsmasq.conf'
+
+DEFAULT_DEPLOYMENT_WORKERS = 4
+DEPLOYMENT_LOG_FILENAME = 'deploy.log'
+
+SERVICE_STATUS_DONE = 'done'
+SERVICE_STATUS_CANCELLED = 'cancelled'
+
+COMPOSE_PROJECT_LABEL = 'com.docker.compose.project'
+DEPLOYMENT_STATE_FILENAME = 'deployment_state.json'
+MISSING_FILE_FINGERPRINT_MARKER = b'<missing>'
+
+CUSTOM_IMAGE_PREFIX = 'custom-'
+BUILD_KEY_LABEL = 'homepose.build-key'
+BUILD_CACHE_IGNORED_PATTERNS = ('*.log', '*.tmp', '.env', 'docker-compose.yml', 'pre_init.sh', 'post_init.sh')
+HASHING_CHUNK_SIZE = 1024 * 1024
+
+COMPOSE_SERVICE_LABEL = 'com.docker.compose.service'
+HOMEPOSE_SERVICE_LABEL = 'homepose.service'
+
+DEFAULT_READINESS_TIMEOUT = 300.0
+READINESS_INITIAL_BACKOFF = 0.1
+READINESS_MAXIMAL_BACKOFF = 5.0
+READINESS_CONNECTION_TIMEOUT = 2.0
+READINESS_EVENTS_PREFIXES = ('health_status', 'die', 'start', 'oom')
+
+SPAN_STATUS_RUNNING = 'running'
+SPAN_STATUS_OK = 'ok'
+SPAN_STATUS_ERROR = 'error'
+REPORTS_FOLDER_NAME = 'reports'
+DEFAULT_TIMING_SUMMARY_SIZE = 0
+DEFAULT_REPORTS_RETENTION = 50
+
+DEFAULT_OUTPUT_TAIL_LINES = 50
+DEFAULT_OUTPUT_LOG_LEVEL = 'DEBUG'
+
+CONFIG_SNAPSHOT_SUFFIX = '.snapshot.json'
+CONFIG_SNAPSHOT_VERSION = 1
+REQUIRED_CONFIG_SETTINGS = ('COMPOSE_FILES_FOLDER', 'TEMPLATES_FOLDER', 'GENERATED_FOLDER', 'HOMEPOSE_DOCKER_NETWORK', 'ENABLED_SERVICES')
+
+SECRETS_STORE_FILENAME = 'secrets.json'
+SECRET_SIZE_BYTES = 16
+
+HOSTS_BLOCK_BEGIN_MARKER = '# BEGIN HOMEPOSE'
+HOSTS_BLOCK_END_MARKER = '# END HOMEPOSE'
+
+PROVISIONING_STATE_FILENAME = 'provisioning_state.json'
+DNS_PACKAGES = ('avahi-daemon', 'dnsmasq')
+DNSMASQ_SERVICE_NAME = 'dnsmasq'
+
+DEFAULT_DAEMON_SOCKET_PATH = '/run/homepose.sock'
+
+DEFAULT_REMOVAL_WORKERS = 8
+
+GATEWAYS_FILENAME = 'gateways.json'
+PROXY_LOCATION_TEMPLATE = 'rproxy.location'
+PROXY_LOCATIONS_FOLDER_NAME = 'locations'
+PER_SERVICE_TEMPLATES = (PROXY_LOCATION_TEMPLATE,)
+WATCHER_DEBOUNCE_SECONDS = 1.0
+CONFIG_POLL_INTERVAL = 2.0
+WATCHED_CONTAINER_EVENTS = ('start', 'die', 'health_status')
+DEFAULT_PROXY_RELOAD_COMMAND = 'nginx -s reload'
+
+MOUNT_POINT_SUFFIX = '_MOUNT_POINT'
+DEFAULT_VOLUME_WORKERS = 8
+TRASH_PREFIX = '.homepose-trash-'
+
+LOCAL_DOCKER_HOST_NAME = 'local'
+AUTO_PLACEMENT = 'auto'
+DEFAULT_HOST_CAPACITY = 10.0
+DEFAULT_SERVICE_WEIGHT = 1.0
+LOCAL_DOCKER_URL_PREFIX = 'unix://'
+LOCAL_ADDRESSES = ('', 'localhost', '127.0.0.1', '::1')
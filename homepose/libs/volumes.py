@@ -0,0 +1,136 @@
+import concurrent.futures
+import contextlib
+import dataclasses
+import os
+import re
+import shutil
+import time
+import typing
+
+import homepose.libs.vars
+
+
+def canonicalize_path(path: str) -> str:
+    return os.path.realpath(os.path.expanduser(path.strip()))
+
+
+def get_tree_size(root_path: str) -> int:
+    tree_size = 0
+    for folder_path, _, filenames in os.walk(root_path, onerror=lambda _: None):
+        for filename in filenames:
+            with contextlib.suppress(OSError):
+                tree_size += os.lstat(f'{folder_path}/{filename}').st_size
+    return tree_size
+
+
+@dataclasses.dataclass
+class HomeposeVolumeManager():
+    mount_points: set
+    persistent_volumes: set = dataclasses.field(default_factory=set)
+    max_workers: int = dataclasses.field(default=homepose.libs.vars.DEFAULT_VOLUME_WORKERS)
+
+    __deletion_executor: typing.Optional[concurrent.futures.ThreadPoolExecutor] = dataclasses.field(init=False, default=None)
+
+    def __post_init__(self) -> None:
+        self.mount_points = {canonicalize_path(mount_point) for mount_point in self.mount_points if mount_point.strip()}
+        self.persistent_volumes = {canonicalize_path(volume) for volume in self.persistent_volumes if volume.strip()}
+
+    @classmethod
+    def from_config(cls, config: dict, max_workers: int = homepose.libs.vars.DEFAULT_VOLUME_WORKERS) -> 'HomeposeVolumeManager':
+        return cls(
+            {
+                setting
+                for setting_name, setting in config.items()
+                if setting_name.endswith(homepose.libs.vars.MOUNT_POINT_SUFFIX) and setting
+            },
+            set(re.split(r'[\s,]+', config.get('PERSISTENT_VOLUMES') or '')),
+            max_workers
+        )
+
+    def is_persistent(self, path: str) -> bool:
+        canonical_path = canonicalize_path(path)
+        return any(
+            os.path.commonpath([canonical_path, persistent_volume]) in (canonical_path, persistent_volume)
+            for persistent_volume in self.persistent_volumes
+        )
+
+    def get_removable_mount_points(self, force: bool = False) -> list:
+        removable_mount_points = {
+            mount_point
+            for mount_point in self.mount_points
+            if os.path.exists(mount_point) and (force or not self.is_persistent(mount_point))
+        }
+        return sorted(
+            mount_point
+            for mount_point in removable_mount_points
+            if not any(mount_point.startswith(f'{other_mount_point}/') for other_mount_point in removable_mount_points)
+        )
+
+    def run_concurrently(self, function: typing.Callable, arguments: typing.Iterable) -> list:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max(self.max_workers, 1)) as executor:
+            return list(executor.map(function, arguments))
+
+    def create_directories(self, extra_directories: typing.Iterable[str] = ()) -> None:
+        self.run_concurrently(
+            lambda directory: os.makedirs(directory, exist_ok=True),
+            sorted(self.mount_points | {canonicalize_path(directory) for directory in extra_directories})
+        )
+
+    def fix_ownership(self, directories: typing.Iterable[str], uid: int, gid: int) -> None:
+        self.run_concurrently(lambda directory: os.chown(directory, uid, gid), directories)
+
+    def get_report(self, force: bool = False) -> list:
+        existing_mount_points = sorted(mount_point for mount_point in self.mount_points if os.path.exists(mount_point))
+        removable_mount_points = self.get_removable_mount_points(force)
+        return [
+            {
+                'path': mount_point,
+                'size': tree_size,
+                'removed': any(
+                    mount_point == removable_mount_point or mount_point.startswith(f'{removable_mount_point}/')
+                    for removable_mount_point in removable_mount_points
+                )
+            }
+            for mount_point, tree_size in zip(existing_mount_points, self.run_concurrently(get_tree_size, existing_mount_points))
+        ]
+
+    def remove_directories(self, force: bool = False) -> list:
+        removable_mount_points = self.get_removable_mount_points(force)
+        trash_paths = self.run_concurrently(self.move_to_trash, removable_mount_points)
+        for trash_path in trash_paths:
+            self.get_deletion_executor().submit(shutil.rmtree, trash_path, True)
+        return removable_mount_points
+
+    @staticmethod
+    def move_to_trash(path: str) -> str:
+        trash_path = f'{os.path.dirname(path)}/{homepose.libs.vars.TRASH_PREFIX}{os.path.basename(path)}-{time.time_ns()}'
+        try:
+            os.rename(path, trash_path)
+        except OSError:
+            return path
+        return trash_path
+
+    def purge_trash(self) -> list:
+        trash_paths = sorted({
+            f'{parent_folder}/{entry}'
+            for parent_folder in {os.path.dirname(mount_point) for mount_point in self.mount_points}
+            if os.path.isdir(parent_folder)
+            for entry in os.listdir(parent_folder)
+            if entry.startswith(homepose.libs.vars.TRASH_PREFIX)
+        })
+        for trash_path in trash_paths:
+            self.get_deletion_executor().submit(shutil.rmtree, trash_path, True)
+        return trash_paths
+
+    def get_deletion_executor(self) -> concurrent.futures.ThreadPoolExecutor:
+        if self.__deletion_executor is None:
+            self.__deletion_executor = concurrent.futures.ThreadPoolExecutor(
+                max_workers=max(self.max_workers, 1),
+                thread_name_prefix='homepose-volume-deletion'
+            )
+        return self.__deletion_executor
+
+    def wait_for_deletions(self) -> None:
+        if self.__deletion_executor is not None:
+            self.__deletion_executor.shutdown(wait=True)
+            self.__deletion_executor = None
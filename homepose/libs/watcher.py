@@ -0,0 +1,132 @@
+import contextlib
+import dataclasses
+import os
+import threading
+import typing
+
+import homepose.libs.deployment
+import homepose.libs.networking
+import homepose.libs.utils
+import homepose.libs.vars
+
+
+@dataclasses.dataclass
+class HomeposeWatcher():  # pylint: disable=R0902
+    deployment: homepose.libs.deployment.HomeposeDeployment
+    networking: homepose.libs.networking.HomeposeNetworking
+    get_advertised_services: typing.Callable[[set], list]
+    reload_config: typing.Callable[[], None]
+    debounce_time: float = dataclasses.field(default=homepose.libs.vars.WATCHER_DEBOUNCE_SECONDS)
+    config_poll_interval: float = dataclasses.field(default=homepose.libs.vars.CONFIG_POLL_INTERVAL)
+
+    running_services: set = dataclasses.field(init=False, default_factory=set)
+
+    __pending_changes: set = dataclasses.field(init=False, default_factory=set)
+    __changes_lock: threading.Condition = dataclasses.field(init=False, default_factory=threading.Condition)
+    __stopped: threading.Event = dataclasses.field(init=False, default_factory=threading.Event)
+    __events_streams: dict = dataclasses.field(init=False, default_factory=dict)
+
+    def start(self) -> None:
+        self.running_services = self.deployment.get_running_services()
+        self.notify('startup')
+        for host_name in self.deployment.placement.hosts:
+            threading.Thread(target=self.watch_docker_events, args=(host_name,), name=f'homepose-watch_docker_events-{host_name}', daemon=True).start()
+        for target in (self.watch_config_file, self.apply_changes):
+            threading.Thread(target=target, name=f'homepose-{target.__name__}', daemon=True).start()
+
+    def stop(self) -> None:
+        self.__stopped.set()
+        for events_stream in list(self.__events_streams.values()):
+            with contextlib.suppress(Exception):
+                events_stream.close()
+        with self.__changes_lock:
+            self.__changes_lock.notify_all()
+
+    def notify(self, change: str) -> None:
+        with self.__changes_lock:
+            self.__pending_changes.add(change)
+            self.__changes_lock.notify_all()
+
+    def handle_event(self, event: dict) -> None:
+        attributes = (event.get('Actor') or {}).get('Attributes') or {}
+        if not (service_name := attributes.get(homepose.libs.vars.HOMEPOSE_SERVICE_LABEL)):
+            return
+        event_status = str(event.get('status') or event.get('Action') or '')
+        if event_status == 'start':
+            with self.__changes_lock:
+                self.running_services.add(service_name)
+        self.notify(f'{service_name}:{event_status}')
+
+    def watch_docker_events(self, host_name: str) -> None:
+        while not self.__stopped.is_set():
+            if (host := self.deployment.placement.hosts.get(host_name)) is None:
+                return
+            try:
+                self.__events_streams[host_name] = self.deployment.get_host_client(host).events(
+                    decode=True,
+                    filters={
+                        'type': 'container',
+                        'label': homepose.libs.vars.HOMEPOSE_SERVICE_LABEL,
+                        'event': list(homepose.libs.vars.WATCHED_CONTAINER_EVENTS)
+                    }
+                )
+                running_services = self.deployment.get_running_services()
+                with self.__changes_lock:
+                    self.running_services = running_services
+                self.notify('events')
+                for event in self.__events_streams[host_name]:
+                    self.handle_event(event)
+            except Exception as encountered_exception:  # pylint: disable=W0703
+                if not self.__stopped.is_set():
+                    homepose.libs.utils.HomeposeLogger().warning(f' Docker events stream of {host_name} interrupted: {encountered_exception}')
+                    self.__stopped.wait(self.config_poll_interval)
+
+    def watch_config_file(self) -> None:
+        config_file_path = self.deployment.enviroment.config_file_path
+        last_stamp = self.get_file_stamp(config_file_path)
+        while not self.__stopped.wait(self.config_poll_interval):
+            if (current_stamp := self.get_file_stamp(config_file_path)) == last_stamp:
+                continue
+            last_stamp = current_stamp
+            try:
+                self.reload_config()
+            except Exception as encountered_exception:  # pylint: disable=W0703
+                homepose.libs.utils.HomeposeLogger().error(f' Configuration reload failed: {encountered_exception}')
+                continue
+            self.notify('config')
+
+    @staticmethod
+    def get_file_stamp(file_path: str) -> typing.Optional[tuple]:
+        with contextlib.suppress(FileNotFoundError):
+            file_stats = os.stat(file_path)
+            return file_stats.st_mtime_ns, file_stats.st_size
+        return None
+
+    def apply_changes(self) -> None:
+        while not self.__stopped.is_set():
+            with self.__changes_lock:
+                while not self.__pending_changes and not self.__stopped.is_set():
+                    self.__changes_lock.wait()
+            if self.__stopped.wait(self.debounce_time):
+                return
+            with self.__changes_lock:
+                applied_changes, self.__pending_changes = self.__pending_changes, set()
+            try:
+                self.reconcile_networking(applied_changes)
+            except Exception as encountered_exception:  # pylint: disable=W0703
+                homepose.libs.utils.HomeposeLogger().error(f' Networking reconciliation failed: {encountered_exception}')
+
+    def reconcile_networking(self, applied_changes: set) -> None:
+        if any(change.endswith(':die') for change in applied_changes):
+            running_services = self.deployment.get_running_services()
+            with self.__changes_lock:
+                self.running_services = running_services
+        with self.__changes_lock:
+            running_services = set(self.running_services)
+        active_services = self.get_advertised_services(running_services)
+        homepose.libs.utils.HomeposeLogger().debug(f' Reconciling networking after {len(applied_changes)} change(s)')
+        if self.networking.update_hosts(active_services):
+            self.networking.provisioner.reload_service(homepose.libs.vars.DNSMASQ_SERVICE_NAME)
+        reverse_proxy = self.deployment.enviroment['REVERSE_PROXY_NAME']
+        if self.networking.update_proxy_locations(active_services) and reverse_proxy in running_services:
+            self.deployment.reload_service(reverse_proxy)
@@ -1,15 +1,20 @@
 #!/usr/bin/env python3
 
+import contextlib
 import dataclasses
+import shutil
+import typing
 
 import homepose.libs.deployment
 import homepose.libs.environment
 import homepose.libs.networking
+import homepose.libs.timing
 import homepose.libs.utils
+import homepose.libs.vars
 
 
 @dataclasses.dataclass
-class HomeposeInstance():
+class HomeposeInstance():  # pylint: disable=R0904
     enviroment: homepose.libs.environment.HomeposeDeployEnvironment = dataclasses.field(init=False, default_factory=homepose.libs.environment.HomeposeDeployEnvironment)
     networking: homepose.libs.networking.HomeposeNetworking = dataclasses.field(init=False, default_factory=homepose.libs.networking.HomeposeNetworking)
     deployment: homepose.libs.deployment.HomeposeDeployment = dataclasses.field(init=False, default_factory=homepose.libs.deployment.HomeposeDeployment)
@@ -20,37 +25,173 @@ class HomeposeInstance():
 
     def __post_init__(self) -> None:
         self.logging = homepose.libs.utils.HomeposeLogger()
-        self._all_services = [
-            self.enviroment['DATABASE_BACKEND'],
-            *self.enviroment.get_enabled_services(),
-            self.enviroment['REVERSE_PROXY_NAME']
-        ]
+        self.refresh_services()
+
+    def refresh_services(self) -> None:
+        self._all_services = self.enviroment.get_all_services()
+
+    def get_services(self) -> list:
+        return list(self._all_services)
+
+    def get_advertised_services(self, running_services: typing.Optional[set] = None) -> list:
+        if running_services is None:
+            running_services = self.deployment.get_running_services()
+        return [service_name for service_name in self.enviroment.get_enabled_services() if service_name in running_services]
+
+    def validate_service(self, service_name: str) -> None:
+        if service_name not in self._all_services:
+            raise shutil.ExecError(f'Service {service_name} is not enabled!')
+
+    @contextlib.contextmanager
+    def timed_run(self, name: str) -> typing.Iterator[None]:
+        try:
+            with homepose.libs.timing.TIMER.run(
+                name,
+                f'{self.enviroment["GENERATED_FOLDER"]}/{homepose.libs.vars.REPORTS_FOLDER_NAME}',
+                int(self.enviroment['REPORTS_RETENTION'] or homepose.libs.vars.DEFAULT_REPORTS_RETENTION)
+            ):
+                yield
+        finally:
+            if not homepose.libs.timing.TIMER.is_running():
+                for summary_line in homepose.libs.timing.TIMER.format_summary(
+                    int(self.enviroment['TIMING_SUMMARY_SIZE'] or homepose.libs.vars.DEFAULT_TIMING_SUMMARY_SIZE)
+                ):
+                    self.logging.info(summary_line)
 
     def start(self) -> None:
+        with self.timed_run('start'):
+            self.prepare_environment()
+            self.logging.info('Starting up available services:')
+            with homepose.libs.timing.TIMER.span('compose_services'):
+                self.deployment.compose_services(self._all_services, self.logging)
+            self.configure_networking()
+
+    def reconcile(self) -> None:
+        with self.timed_run('reconcile'):
+            self.prepare_environment()
+            self.logging.info('Reconciling available services:')
+            with homepose.libs.timing.TIMER.span('reconcile_services'):
+                self.deployment.reconcile_services(self._all_services, self.logging)
+            self.configure_networking()
+
+    def start_service(self, service_name: str) -> None:
+        self.validate_service(service_name)
+        with self.timed_run(f'start-{service_name}'):
+            self.deploy_service(service_name)
+            self.advertise_services()
+
+    def stop_service(self, service_name: str) -> None:
+        self.validate_service(service_name)
+        with self.timed_run(f'stop-{service_name}'):
+            self.decompose_service(service_name)
+            self.advertise_services()
+
+    def restart_service(self, service_name: str) -> None:
+        self.validate_service(service_name)
+        with self.timed_run(f'restart-{service_name}'):
+            self.decompose_service(service_name)
+            self.deploy_service(service_name)
+            self.advertise_services()
+
+    def deploy_service(self, service_name: str) -> None:
+        self.prepare_environment()
+        self.logging.info(f'Starting service {service_name}')
+        with homepose.libs.timing.TIMER.span('deploy_services', service_name):
+            self.deployment.deploy_services([service_name], self.logging)
+
+    def decompose_service(self, service_name: str) -> None:
+        self.logging.info(f'Stopping service {service_name}')
+        with homepose.libs.timing.TIMER.span('decompose_services', service_name):
+            self.deployment.decompose_services([service_name])
+
+    def get_status(self, service_name: str = '') -> dict:
+        if service_name:
+            self.validate_service(service_name)
+        return self.deployment.get_services_status([service_name] if service_name else self._all_services)
+
+    def reload_config(self) -> None:
+        self.logging.info('Reloading configuration')
+        self.enviroment.reload_config()
+        self.refresh_services()
+        self.networking.export_host_variables()
+
+    def prepare_environment(self) -> None:
+        self.networking.export_host_variables()
         self.logging.info('Mounting services directories')
-        self.enviroment.mount_directories()
-        self.logging.info('Starting up available services:')
-        for service in self._all_services:
-            self.enviroment.export_secret(service)
-        self.deployment.compose_services(self._all_services, self.logging)
+        with homepose.libs.timing.TIMER.span('mount_directories'):
+            self.enviroment.mount_directories()
+        with homepose.libs.timing.TIMER.span('export_secrets'):
+            self.enviroment.export_secrets(self._all_services)
+
+    def configure_networking(self) -> None:
         self.logging.info('Configuring and enabling DNSMasq')
-        self.networking.configure_dns()
-        self.networking.broadcast_gateways(self.deployment.enviroment.get_enabled_services())
+        with homepose.libs.timing.TIMER.span('configure_dns'):
+            self.networking.configure_dns()
+        self.advertise_services()
+
+    def advertise_services(self) -> None:
+        advertised_services = self.get_advertised_services()
+        with homepose.libs.timing.TIMER.span('broadcast_gateways'):
+            self.networking.broadcast_gateways(advertised_services)
+        with homepose.libs.timing.TIMER.span('update_proxy_locations'):
+            if self.networking.update_proxy_locations(advertised_services):
+                self.deployment.reload_service(self.enviroment['REVERSE_PROXY_NAME'])
 
     def stop(self) -> None:
-        self.logging.info(' Decomposing running services')
-        self.deployment.remove_current_containers()
-        self.logging.info(' Running containers purged!')
-
-    def restart(self) -> None:
-        self.logging.info('Stopping all running Docker services')
-        self.stop()
-        self.logging.info('Restarting docker network')
-        self.deployment.restart_docker_network(
-            self.enviroment['HOMEPOSE_DOCKER_NETWORK']
-        )
-        self.logging.info('Starting enabled Docker services')
-        self.start()
+        with self.timed_run('stop'):
+            self.logging.info(' Decomposing running services')
+            with homepose.libs.timing.TIMER.span('remove_containers'):
+                self.deployment.remove_current_containers()
+            self.logging.info(' Running containers purged!')
+
+    def restart(self, rolling: bool = False) -> None:
+        if rolling:
+            self.rolling_restart()
+            return
+        with self.timed_run('restart'):
+            self.logging.info('Stopping all running Docker services')
+            self.stop()
+            self.logging.info('Starting enabled Docker services')
+            self.start()
+
+    def rolling_restart(self) -> None:
+        with self.timed_run('rolling_restart'):
+            self.prepare_environment()
+            self.logging.info('Restarting services one by one, dependents first:')
+            self.deployment.rolling_restart(self._all_services, self.logging)
+            self.configure_networking()
+
+    def reset_network(self) -> None:
+        with self.timed_run('reset_network'):
+            self.logging.info('Stopping all running Docker services')
+            self.stop()
+            self.logging.info('Restarting docker network')
+            with homepose.libs.timing.TIMER.span('restart_docker_network'):
+                self.deployment.restart_docker_network(
+                    self.enviroment['HOMEPOSE_DOCKER_NETWORK']
+                )
+
+    def remove_volumes(self, force: bool = False, dry_run: bool = False, wait: bool = False) -> list:
+        with self.timed_run('remove_volumes'):
+            self.logging.info('Checking services volumes' if dry_run else 'Removing services volumes')
+            volumes_report = self.enviroment.unmount_directories(force, dry_run)
+            for volume in volumes_report:
+                if dry_run:
+                    self.logging.info(f' {volume["path"]}: {volume["size"]} B, {"would be removed" if volume["removed"] else "kept"}')
+                else:
+                    self.logging.info(f' Removed volume: {volume["path"]}')
+            if wait and not dry_run:
+                self.enviroment.volumes.wait_for_deletions()
+        return volumes_report
+
+    def prune_images(self) -> None:
+        self.logging.info('Pruning stale custom Docker images')
+        for image_name in self.deployment.prune_images(self._all_services):
+            self.logging.info(f' Removed image: {image_name}')
+
+    def rotate_secret(self, service_name: str) -> None:
+        self.logging.info(f'Rotating secret of {service_name}')
+        self.enviroment.rotate_secret(service_name)
 
     def add_external_service(self, ip_address: str, name: str) -> None:
         self.networking.add_gateway(ip_address, name)
@@ -20,7 +20,8 @@ setuptools.setup(
     install_requires=[
         'docker==4.1.0',
         'configparser==5.2.0',
-        'python-dotenv==0.19.2'
+        'python-dotenv==0.19.2',
+        'PyYAML==6.0'
     ],
     zip_safe=False
 )
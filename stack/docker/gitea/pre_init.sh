@@ -1,9 +1,3 @@
-GITEA_GENERATED_SECRET="${GITEA_COMPOSE_FILES_FOLDER}/.env"
-if [ ! -f ${GITEA_GENERATED_SECRET} ]; then
-    echo 'Secret ENVFILE not found. Exporting generated GITEA_SECRET.'
-    echo "GITEA_SECRET=${GITEA_SECRET}" > "${GITEA_COMPOSE_FILES_FOLDER}/.env"
-fi
-
 echo 'Generating entrypoint script to create admin user'
 echo '#!/usr/bin/env bash
 ATTEMPT=0